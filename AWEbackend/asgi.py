@@ -2,6 +2,9 @@
 ASGI config for AWEbackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn AWEbackend.asgi:application``); the
+/api/events/ streams are refused under WSGI. Events are delivered in-process, so
+run a single worker unless EVENT_STREAM_BACKEND points at a shared broker.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "rest_framework",
     "base",
     "corsheaders"
@@ -144,3 +146,56 @@ REST_FRAMEWORK = {
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
 ]
+
+# Signed tokens issued by /api/user/login/. Tokens are verified with HMAC plus one query
+# against the revoked_token table and UserModel.tokens_valid_after, so logout and forced
+# revocation apply to every process. purge_revoked_tokens deletes rows of expired tokens.
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=15)
+REFRESH_TOKEN_LIFETIME = timedelta(days=7)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Seconds a cached catalog response is kept. Product and category writes invalidate
+# cached responses in every process by bumping the catalog version, which is kept in
+# the catalog_version table rather than in the cache.
+CATALOG_CACHE_TTL = 300
+
+# Rows written per bulk upsert (and per transaction) by /api/product/import/
+PRODUCT_IMPORT_CHUNK_SIZE = 1000
+
+# Lower bounds of the price ranges reported by /api/product/facets/. The last range is open-ended.
+PRODUCT_PRICE_BUCKETS = [0, 10, 25, 50, 100, 250]
+
+# Stock taken by place_order is held until the invoice due date plus this grace period,
+# after which release_expired_reservations returns it to stock and cancels the invoice.
+STOCK_RESERVATION_GRACE_PERIOD = timedelta(hours=1)
+
+# Responses to place-order and pay-invoice requests sent with an Idempotency-Key header
+# are replayed for IDEMPOTENCY_KEY_TTL. A retry that arrives while the first attempt is
+# still running waits up to IDEMPOTENCY_WAIT_TIMEOUT seconds for it; an attempt running
+# longer than IDEMPOTENCY_LOCK_TIMEOUT seconds is treated as abandoned.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Seconds the /api/shipment/dashboard/ snapshot is cached. Shipment writes drop it immediately.
+SHIPMENT_DASHBOARD_TTL = 30
+
+# Seconds a /api/shipment/track/{tracking_number}/ answer is cached, including "not found".
+# Status changes refresh it immediately.
+SHIPMENT_TRACKING_TTL = 15
+
+# Server-sent events on /api/events/, served only under ASGI. Each process keeps the last
+# EVENT_STREAM_BUFFER_SIZE events for clients resuming with Last-Event-ID and serves at
+# most EVENT_STREAM_MAX_CONNECTIONS streams. The in-process broker is the only backend
+# shipped and events never cross processes: a stream only sees changes made by the
+# process serving it, so run a single ASGI worker, or point EVENT_STREAM_BACKEND at a
+# broker with the same publish/subscribe/unsubscribe interface on a shared message bus.
+EVENT_STREAM_BACKEND = "base.events.InProcessBroker"
+EVENT_STREAM_BUFFER_SIZE = 1000
+EVENT_STREAM_MAX_CONNECTIONS = 500
+EVENT_STREAM_KEEPALIVE = 15
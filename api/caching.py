@@ -0,0 +1,38 @@
+import hashlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from base.managers import CatalogCache
+
+def cached_catalog_response(request, scope, build):
+    """
+    Serve a catalog read through the versioned CatalogCache.
+    Entries are keyed by `scope` (e.g. "public" or "admin"), absolute URL (payloads
+    embed links built from the request host) and query params under the current
+    catalog version. `build` produces the payload on a miss. A request whose
+    If-None-Match matches the current ETag gets a 304 after only the version lookup.
+    """
+    catalog_cache = CatalogCache()
+    version = catalog_cache.version()
+
+    params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+    key = hashlib.sha256(repr((scope, request.build_absolute_uri(request.path), params)).encode("utf-8")).hexdigest()
+    etag = f'"{version}-{key[:32]}"'
+
+    if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = catalog_cache.get(version, key)
+        if data is None:
+            data = build()
+            catalog_cache.set(version, key, data)
+        response = Response(data)
+
+    response["ETag"] = etag
+    patch_vary_headers(response, ["Authorization"])
+    return response
@@ -5,3 +5,4 @@ from .order_view import OrderViewSet
 from .category_view import CategoryViewSet
 from .shipment_view import ShipmentViewSet
 from .shopping_cart_view import ShoppingCartViewSet
+from .event_view import event_stream
@@ -1,9 +1,9 @@
 from rest_framework import viewsets
-from rest_framework.response import Response
 
+from api.caching import cached_catalog_response
 from api.serializers import CategoryModelSerializer
 
-from base.models import CategoryModel
+from base.managers import CategoryRegistry
 
 class CategoryViewSet(viewsets.ViewSet):
     def list(self, request):
@@ -11,7 +11,9 @@ class CategoryViewSet(viewsets.ViewSet):
         GET /api/category/
         Returns all categories as a flat list.
         """
-        queryset = CategoryModel.objects.all().order_by("name")
-        serializer = CategoryModelSerializer(queryset, many=True)
+        def build():
+            categories = CategoryRegistry().all()
+            serializer = CategoryModelSerializer(categories, many=True)
+            return serializer.data
 
-        return Response(serializer.data)
+        return cached_catalog_response(request, "public", build)
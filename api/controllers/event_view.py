@@ -0,0 +1,90 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from base.enums import ROLE
+from base.events import StreamLimitExceeded, get_broker
+
+from api.permissions import get_access_token_claims, get_authenticated_user
+from api.tokens import verify_access_token
+
+# Roles that receive every event; everyone else only sees events about their own orders
+STREAM_ALL_ROLES = [ROLE.ADMIN.value, ROLE.SHIPMENT_MANAGER.value]
+
+def _stream_identity(request):
+    """
+    (user id, role) of the caller. Browsers' EventSource cannot set headers, so
+    the access token may also be passed as ?token=.
+    """
+    claims = get_access_token_claims(request)
+    if claims is None and request.GET.get("token"):
+        verified = verify_access_token(request.GET["token"])
+        if verified is not None:
+            claims, _ = verified
+    if claims is not None:
+        return claims["uid"], claims["role"]
+
+    user = get_authenticated_user(request)
+    if user:
+        return str(user.pk), user.role
+    return None
+
+def _last_event_id(request):
+    value = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+def _format_event(event):
+    data = json.dumps(event["data"], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+async def event_stream(request):
+    """
+    Server-sent events for shipment and order status changes - GET /api/events/
+    Needs an ASGI server; reconnecting clients resume after their Last-Event-ID.
+    """
+    # Under WSGI the endless stream is read to the end before anything is sent,
+    # holding the worker forever without delivering a byte
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "Event streams need an ASGI server, e.g. uvicorn AWEbackend.asgi:application"},
+            status=501
+        )
+
+    identity = await sync_to_async(_stream_identity)(request)
+    if identity is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    user_id, role = identity
+
+    try:
+        subscription = get_broker().subscribe(_last_event_id(request))
+    except StreamLimitExceeded:
+        response = JsonResponse({"error": "Too many open event streams, try again later"}, status=503)
+        response["Retry-After"] = "5"
+        return response
+
+    keepalive = getattr(settings, "EVENT_STREAM_KEEPALIVE", 15)
+
+    async def stream():
+        try:
+            yield f"retry: {keepalive * 1000}\n\n"
+            while not subscription.exhausted:
+                event = await subscription.get(keepalive)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif role in STREAM_ALL_ROLES or event["user_id"] == user_id:
+                    yield _format_event(event)
+            # Fell too far behind; the client reconnects and catches up from its Last-Event-ID
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -13,6 +13,21 @@ from api.permissions import HasRolePermission
 from api.serializers import ProductModelSerializer
 
 class InventoryViewSet(viewsets.ViewSet):
+    @action(detail=False, methods=["get"])
+    def levels(self, request):
+        """
+        GET /api/inventory/levels/
+        Stock per product: stock (available to sell), reserved (held for unpaid
+        invoices) and on_hand (stock plus reserved).
+        """
+        if not HasRolePermission([ROLE.INVENTORY_MANAGER, ROLE.ADMIN]).has_permission(request, self):
+            raise PermissionDenied("Only inventory managers and admins can view stock levels.")
+
+        levels = InventoryManager().stock_levels().order_by("name", "id").values(
+            "id", "name", "stock", "reserved", "on_hand"
+        )
+        return Response(list(levels), status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["post"])
     def update_stock(self, request, pk=None):
         if not HasRolePermission([ROLE.INVENTORY_MANAGER, ROLE.ADMIN]).has_permission(request, self):
@@ -1,30 +1,40 @@
+from django.db.models import Prefetch
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
-from base.models import OrderModel, InvoiceModel
+from base.models import OrderModel, OrderItemModel, InvoiceModel
 from base.enums import ROLE
 from base.managers import StatisticsManager
 
 from api.serializers import InvoiceModelSerializer, OrderModelSerializer
+from api.pagination import KeysetPagination
 from api.permissions import HasRolePermission, get_authenticated_user
 
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OrderModelSerializer
     queryset = OrderModel.objects.all()
+    pagination_class = KeysetPagination
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         user = get_authenticated_user(self.request)
         if not user:
             return OrderModel.objects.none()
         
+        # Load everything the serializer reads in a fixed number of queries
+        querySet = OrderModel.objects.select_related("shipment", "invoice").prefetch_related(
+            Prefetch("items", queryset=OrderItemModel.objects.select_related("product"))
+        )
+
         # Admins can see all orders
         if HasRolePermission([ROLE.ADMIN]).has_permission(self.request, self):
-            return OrderModel.objects.all()
+            return querySet
         
         # Customers can only see their own orders
-        return OrderModel.objects.filter(user=user)
+        return querySet.filter(user=user)
 
     @action(detail=False, methods=["get"], url_path="analytics")
     def analytics(self, request):
@@ -1,3 +1,6 @@
+import codecs
+
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from rest_framework import viewsets, status
@@ -5,62 +8,106 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 
-from base.models import ProductModel, CategoryModel
+from base.models import ProductModel
 from base.enums import ROLE
+from base.managers import CartManager, CategoryRegistry, ProductFacetManager, ProductImportManager, ProductSearchManager, ProductUpdateManager
 
+from api.caching import cached_catalog_response
+from api.pagination import KeysetPagination
 from api.permissions import HasRolePermission
-from api.serializers import ProductModelSerializer
+from api.serializers import ProductBulkUpdateSerializer, ProductModelSerializer, ProductReadSerializer
 
 class ProductViewSet(viewsets.ViewSet):
+    cursor_ordering = ("name", "id")
+
     def list(self, request):
         """
         GET /api/product/
         Optional query params:
         - categories (comma‑separated strings) e.g. ?categories=cat1,cat2
         - include_inactive (boolean) e.g. ?include_inactive=true (admin only)
+        - cursor, limit e.g. ?limit=50 then ?cursor=<next cursor> (opt-in pagination by name)
 
         If categories is provided, returns products linked to those categories.
         By default, only returns active products unless include_inactive=true and user is admin.
+        Responses are cached per query under the catalog version and carry an ETag.
         """
-        querySet = ProductModel.objects.all()
+        def build():
+            querySet = ProductReadSerializer.rows(self._filter_products(request, ProductModel.objects.all()))
 
-        # Handle include_inactive parameter (admin only)
-        include_inactive = request.query_params.get("include_inactive", "false").lower() == "true"
-        if not include_inactive:
-            querySet = querySet.filter(is_active=True)
-        elif include_inactive and not HasRolePermission([ROLE.ADMIN]).has_permission(request, self):
-            # Non-admin users cannot see inactive products
-            querySet = querySet.filter(is_active=True)
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(querySet, request, view=self)
+            if page is not None:
+                serializer = ProductReadSerializer(page, many=True)
+                return paginator.get_paginated_response(serializer.data).data
 
-        categoriesParam = request.query_params.get("categories")
-        if categoriesParam:
-            categoryIds = [c.strip() for c in categoriesParam.split(",") if c.strip()]
-            valid_category_ids = []
-            for cat_id in categoryIds:
-                try:
-                    CategoryModel.objects.get(id=cat_id) 
-                    valid_category_ids.append(cat_id)
-                except CategoryModel.DoesNotExist:
-                    pass
-            
-            if valid_category_ids:
-                querySet = querySet.filter(category__in=valid_category_ids)
-            else:
-                querySet = querySet.none()
+            serializer = ProductReadSerializer(querySet, many=True)
+            return serializer.data
+
+        # Admin listings that include inactive products are cached apart from public ones
+        scope = "admin" if self._include_inactive(request) else "public"
+        return cached_catalog_response(request, scope, build)
+
+    @action(detail=False, methods=["get"], url_path="facets")
+    def facets(self, request):
+        """
+        GET /api/product/facets/
+        Product counts per category, per price range and in/out of stock.
+        Accepts the same categories and include_inactive params as list and is
+        cached per combination under the catalog version.
+        """
+        def build():
+            querySet = self._filter_products(request, ProductModel.objects.all())
+            return ProductFacetManager().facets(querySet)
+
+        scope = "admin" if self._include_inactive(request) else "public"
+        return cached_catalog_response(request, scope, build)
 
-        serializer = ProductModelSerializer(querySet, many=True)
+    @action(detail=False, methods=["get"], url_path="search")
+    def search(self, request):
+        """
+        GET /api/product/search/?q=<text>
+        Ranked full-text and typo-tolerant search over product name, description
+        and category name (typo tolerance needs PostgreSQL). Accepts the same
+        categories and include_inactive params as list, plus limit (default 20, max 100).
+        """
+        term = request.query_params.get("q", "").strip()
+        if not term:
+            return Response(
+                {"error": "q is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), 100)
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit <= 0:
+            return Response(
+                {"error": "limit must be greater than 0"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        querySet = self._filter_products(request, ProductModel.objects.select_related("category"))
+        products = ProductSearchManager().search(term, querySet, limit)
+        serializer = ProductModelSerializer(products, many=True)
 
         return Response(serializer.data)
-  
+
     def retrieve(self, request, pk=None):
         """
         GET /api/product/{id}/
         Returns a specific product by ID.
         """
-        product = get_object_or_404(ProductModel, pk=pk)
-        serializer = ProductModelSerializer(product)
+        def build():
+            row = get_object_or_404(ProductReadSerializer.rows(ProductModel.objects.all()), pk=pk)
+            serializer = ProductReadSerializer(row)
+            return serializer.data
 
-        return Response(serializer.data)
+        return cached_catalog_response(request, "public", build)
 
     def create(self, request):
         if not HasRolePermission([ROLE.ADMIN]).has_permission(request, self):
@@ -79,14 +126,100 @@ class ProductViewSet(viewsets.ViewSet):
             raise PermissionDenied("Only admin users can update products")
             
         product = get_object_or_404(ProductModel, pk=pk)
+        previous_price = product.price
         serializer = ProductModelSerializer(product, data=request.data)
         
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                # Carts store their totals, so reprice the ones holding this product
+                if product.price != previous_price:
+                    CartManager().refresh_totals_for_products([product.id])
             return Response(serializer.data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_products(self, request):
+        """
+        POST /api/product/import/
+        Bulk create or update products. Admin only.
+        Body is streamed row by row as CSV (Content-Type: text/csv, with a header row)
+        or NDJSON (Content-Type: application/x-ndjson).
+        Fields: id (optional, updates the product when it exists), name, description,
+        price, stock, category_id (category id or name), is_active.
+        Returns the number of imported rows and a per-row error report.
+        """
+        if not HasRolePermission([ROLE.ADMIN]).has_permission(request, self):
+            raise PermissionDenied("Only admin users can import products")
+
+        content_type = (request.content_type or "").split(";")[0].strip().lower()
+        if content_type not in ("text/csv", "application/x-ndjson", "application/jsonl"):
+            return Response(
+                {"error": "Content-Type must be text/csv or application/x-ndjson"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        # Read the raw body line by line instead of request.data so the file
+        # is never held in memory as a whole
+        if request.stream is None:
+            return Response(
+                {"error": "Request body is empty"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        lines = codecs.iterdecode(request.stream, "utf-8-sig")
+
+        manager = ProductImportManager()
+        if content_type == "text/csv":
+            report = manager.import_csv(lines)
+        else:
+            report = manager.import_ndjson(lines)
+
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="bulk-update")
+    def bulk_update(self, request):
+        """
+        POST /api/product/bulk-update/
+        Update price, is_active and/or description of many products at once. Admin only.
+        Body is either:
+        - {"patches": [{"id": "...", "price": "9.99", "is_active": false, "description": "..."}]}
+        - {"filter": {"categories": ["cat1"], "ids": ["..."]}, "set": {"is_active": false}}
+        Returns match and update counts plus the ids that were not found.
+        """
+        if not HasRolePermission([ROLE.ADMIN]).has_permission(request, self):
+            raise PermissionDenied("Only admin users can update products")
+
+        serializer = ProductBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        manager = ProductUpdateManager()
+        data = serializer.validated_data
+
+        if "patches" in data:
+            result = manager.apply_patches(data["patches"])
+            return Response(result, status=status.HTTP_200_OK)
+
+        querySet = ProductModel.objects.all()
+        product_filter = data["filter"]
+        if "categories" in product_filter:
+            querySet = querySet.filter(category__in=CategoryRegistry().existing_ids(product_filter["categories"]))
+
+        not_found = []
+        if "ids" in product_filter:
+            querySet = querySet.filter(id__in=product_filter["ids"])
+            existing_ids = set(ProductModel.objects.filter(id__in=product_filter["ids"]).values_list("id", flat=True))
+            not_found = [str(product_id) for product_id in product_filter["ids"] if product_id not in existing_ids]
+
+        updated = manager.apply_to_queryset(querySet, data["set"])
+
+        return Response({
+            "matched": updated,
+            "updated": {field: updated for field in data["set"]},
+            "not_found": not_found,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["put"], url_path="enable")
     def enable_product(self, request, pk=None):
         """
@@ -118,3 +251,27 @@ class ProductViewSet(viewsets.ViewSet):
         
         serializer = ProductModelSerializer(product)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def _include_inactive(self, request):
+        """Whether include_inactive=true was requested by an admin"""
+        include_inactive = request.query_params.get("include_inactive", "false").lower() == "true"
+        # Non-admin users cannot see inactive products
+        return include_inactive and HasRolePermission([ROLE.ADMIN]).has_permission(request, self)
+
+    def _filter_products(self, request, querySet):
+        """Apply the include_inactive and categories filters shared by list and search"""
+        # Handle include_inactive parameter (admin only)
+        if not self._include_inactive(request):
+            querySet = querySet.filter(is_active=True)
+
+        categoriesParam = request.query_params.get("categories")
+        if categoriesParam:
+            categoryIds = [c.strip() for c in categoriesParam.split(",") if c.strip()]
+            valid_category_ids = CategoryRegistry().existing_ids(categoryIds)
+            
+            if valid_category_ids:
+                querySet = querySet.filter(category__in=valid_category_ids)
+            else:
+                querySet = querySet.none()
+
+        return querySet
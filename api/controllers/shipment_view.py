@@ -2,17 +2,21 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import AllowAny
 
 from base.models import ShipmentModel
 from base.managers import ShipmentManager
 from base.enums import ROLE, SHIPMENT_STATUS
 
+from api.pagination import KeysetPagination
 from api.permissions import HasRolePermission, get_authenticated_user
-from api.serializers import ShipmentModelSerializer
+from api.serializers import ShipmentBulkStatusSerializer, ShipmentModelSerializer
 
 class ShipmentViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ShipmentModelSerializer
     queryset = ShipmentModel.objects.all()
+    pagination_class = KeysetPagination
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         user = get_authenticated_user(self.request)
@@ -64,19 +68,14 @@ class ShipmentViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
         current_status = shipment.status
-        if current_status == SHIPMENT_STATUS.DELIVERED.value and new_status != SHIPMENT_STATUS.FAILED.value:
-            return Response(
-                {"error": "Cannot change status of a delivered shipment (except to failed)"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if current_status == SHIPMENT_STATUS.FAILED.value:
+        shipment_manager = ShipmentManager()
+        transition_error = shipment_manager.transition_error(current_status, new_status)
+        if transition_error:
             return Response(
-                {"error": "Cannot update status of a failed shipment"}, 
+                {"error": transition_error}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        shipment_manager = ShipmentManager()
         shipment_manager.update_shipment_status(shipment.id, new_status)
         
         shipment.refresh_from_db()
@@ -87,44 +86,57 @@ class ShipmentViewSet(viewsets.ReadOnlyModelViewSet):
             "shipment": serializer.data
         })
 
+    @action(detail=False, methods=['get'], url_path=r'track/(?P<tracking_number>[^/.]+)', permission_classes=[AllowAny])
+    def track(self, request, tracking_number=None):
+        """
+        Public tracking lookup.
+        GET /api/shipment/track/{tracking_number}/
+        Answers are cached for SHIPMENT_TRACKING_TTL seconds and refreshed when the status changes.
+        """
+        shipment_status = ShipmentManager().get_shipment_status(tracking_number)
+        if shipment_status is None:
+            return Response(
+                {"error": "Shipment not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(shipment_status)
+
+    @action(detail=False, methods=['post'], url_path='bulk-update-status')
+    def bulk_update_status(self, request):
+        """
+        Update the status of many shipments by tracking number (for shipment managers and admins only).
+        POST /api/shipment/bulk-update-status/
+        Body: {"updates": [{"tracking_number": "AWE...", "status": "shipped", "timestamp": "2025-01-01T10:00:00Z"}]}
+
+        Each update is reported as updated, unchanged, stale (scanned before the shipment's
+        current status took effect), rejected (transition not allowed) or not_found.
+        """
+        permission_check = HasRolePermission([ROLE.ADMIN, ROLE.SHIPMENT_MANAGER])
+        if not permission_check.has_permission(request, self):
+            raise PermissionDenied("Only shipment managers and admins can update shipment status")
+
+        serializer = ShipmentBulkStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results = ShipmentManager().bulk_update_status(serializer.validated_data["updates"])
+
+        return Response({
+            "updated": sum(1 for result in results if result["outcome"] == "updated"),
+            "results": results
+        })
+
     @action(detail=False, methods=['get'], url_path='dashboard')
     def dashboard(self, request):
         """
         Shipment dashboard with statistics (for shipment managers and admins only).
         GET /api/shipment/dashboard/
+        Cached for SHIPMENT_DASHBOARD_TTL seconds or until a shipment changes.
         """
         permission_check = HasRolePermission([ROLE.ADMIN, ROLE.SHIPMENT_MANAGER])
         if not permission_check.has_permission(request, self):
             raise PermissionDenied("Only shipment managers and admins can view the dashboard")
 
-        total_shipments = ShipmentModel.objects.count()
-        
-        status_counts = {}
-        for shipment in ShipmentModel.objects.all():
-            status = shipment.status
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        recent_shipments = ShipmentModel.objects.order_by('-created_at')[:10]
-        recent_serializer = ShipmentModelSerializer(recent_shipments, many=True)
-        
-        # Calculate average delivery time for completed shipments
-        delivered_shipments = ShipmentModel.objects.filter(
-            status=SHIPMENT_STATUS.DELIVERED.value,
-            actual_delivery__isnull=False
-        )
-        
-        avg_delivery_time = None
-        if delivered_shipments.exists():
-            total_delivery_time = sum(
-                (shipment.actual_delivery - shipment.created_at).total_seconds()
-                for shipment in delivered_shipments
-            )
-            avg_delivery_time = total_delivery_time / delivered_shipments.count() / 86400 
-        
-        return Response({
-            "total_shipments": total_shipments,
-            "status_counts": status_counts,
-            "recent_shipments": recent_serializer.data,
-            "avg_delivery_time_days": round(avg_delivery_time, 2) if avg_delivery_time else None,
-            "valid_statuses": [status.value for status in SHIPMENT_STATUS]
-        }) 
+        # Served from a short-lived snapshot that shipment writes invalidate
+        return Response(ShipmentManager().dashboard())
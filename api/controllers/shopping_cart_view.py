@@ -2,17 +2,20 @@ from datetime import timedelta
 import uuid
 
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from base.models import ShoppingCartModel, CartItemModel, ProductModel, OrderModel, OrderItemModel, InvoiceModel, PaymentModel, ReceiptModel
-from base.managers import InventoryManager, ShipmentManager
-from base.enums import ROLE, INVOICE_STATUS, ORDER_PAYMENT_STATUS
+from base.models import UserModel, ShoppingCartModel, CartItemModel, ProductModel, OrderModel, OrderItemModel, InvoiceModel, PaymentModel, ReceiptModel
+from base.managers import CartManager, InventoryManager, ShipmentManager, WalletManager
+from base.enums import ROLE, INVOICE_STATUS, ORDER_PAYMENT_STATUS, PAYMENT_STATUS, WALLET_TRANSACTION_TYPE
+from base.events import publish_event
 
-from api.serializers import ShoppingCartModelSerializer
+from api.idempotency import idempotent
+from api.serializers import CartBatchSerializer, ShoppingCartModelSerializer
 from api.permissions import HasRolePermission, get_authenticated_user
 
 class ShoppingCartViewSet(viewsets.ViewSet):
@@ -24,10 +27,23 @@ class ShoppingCartViewSet(viewsets.ViewSet):
         """Get the current user's shopping cart - GET /api/shopping-cart/"""
         user = get_authenticated_user(request)
         cart, created = ShoppingCartModel.objects.get_or_create(user=user)
-        serializer = ShoppingCartModelSerializer(cart)
+        serializer = self._cart_serializer(cart)
 
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request):
+        """
+        Get the cart total and item count without its items -
+        GET /api/shopping-cart/summary/
+        """
+        user = get_authenticated_user(request)
+        cart = ShoppingCartModel.objects.filter(user=user).values("total", "item_count").first()
+        if cart is None:
+            return Response({"total": 0, "total_items": 0})
+
+        return Response({"total": cart["total"], "total_items": cart["item_count"]})
+
     def create(self, request):
         """Add item to cart - POST /api/shopping-cart/"""
         user = get_authenticated_user(request)
@@ -40,29 +56,59 @@ class ShoppingCartViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Reject bad quantities before touching the database
+        if isinstance(quantity, bool) or not str(quantity).strip().isdigit() or int(quantity) <= 0:
+            return Response(
+                {"error": "quantity must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        quantity = int(quantity)
+
         try:
             product = ProductModel.objects.get(id=product_id)
             cart, created = ShoppingCartModel.objects.get_or_create(user=user)
             
-            # Check if item already exists in cart
-            cart_item, item_created = CartItemModel.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={"quantity": quantity}
-            )
-            
-            if not item_created:
-                # Update quantity if item already exists
-                cart_item.quantity += quantity
-                cart_item.save()
+            # Upserts the line in one statement, keeping the cart totals in step
+            CartManager().add_item(cart, product, quantity)
 
-            serializer = ShoppingCartModelSerializer(cart)
+            serializer = self._cart_serializer(cart)
 
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except ProductModel.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        """
+        Apply several cart changes at once - 
+        POST /api/shopping-cart/batch/
+        Body: {"operations": [{"op": "add" | "set" | "remove", "product_id": "...", "quantity": 1}]}
+        Operations run in order in one transaction; "set" with quantity 0 removes the item
+        and removing an item that is not in the cart does nothing. Returns the final cart.
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        operations = serializer.validated_data["operations"]
+        product_ids = {operation["product_id"] for operation in operations}
+        products = ProductModel.objects.in_bulk(product_ids)
+
+        missing = [str(product_id) for product_id in product_ids if product_id not in products]
+        if missing:
+            return Response(
+                {"error": "Products not found", "product_ids": sorted(missing)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        user = get_authenticated_user(request)
+        cart, created = ShoppingCartModel.objects.get_or_create(user=user)
+        CartManager().apply_operations(cart, operations, products)
+
+        serializer = self._cart_serializer(cart)
+        return Response(serializer.data)
+
     @action(detail=False, methods=["put"], url_path="update-item")
     def update_item(self, request):
         """
@@ -79,17 +125,25 @@ class ShoppingCartViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # The cart totals are adjusted by price * quantity, so only whole numbers get through
+        try:
+            if isinstance(quantity, bool):
+                raise ValueError
+            quantity = int(str(quantity).strip())
+        except ValueError:
+            return Response(
+                {"error": "quantity must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             cart = ShoppingCartModel.objects.get(user=user)
-            cart_item = CartItemModel.objects.get(cart=cart, product_id=product_id)
-            
-            if quantity <= 0:
-                cart_item.delete()
-            else:
-                cart_item.quantity = quantity
-                cart_item.save()
+            cart_item = CartItemModel.objects.select_related("product").get(cart=cart, product_id=product_id)
 
-            serializer = ShoppingCartModelSerializer(cart)
+            # A quantity of 0 or less removes the item
+            CartManager().set_item_quantity(cart, cart_item, quantity)
+
+            serializer = self._cart_serializer(cart)
 
             return Response(serializer.data)
 
@@ -113,20 +167,22 @@ class ShoppingCartViewSet(viewsets.ViewSet):
 
         try:
             cart = ShoppingCartModel.objects.get(user=user)
-            cart_item = CartItemModel.objects.get(cart=cart, product_id=product_id)
-            cart_item.delete()
+            cart_item = CartItemModel.objects.select_related("product").get(cart=cart, product_id=product_id)
+            CartManager().remove_item(cart, cart_item)
 
-            serializer = ShoppingCartModelSerializer(cart)
+            serializer = self._cart_serializer(cart)
             return Response(serializer.data)
 
         except (ShoppingCartModel.DoesNotExist, CartItemModel.DoesNotExist):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
     @action(detail=False, methods=["post"], url_path="place-order")
+    @idempotent
     def place_order(self, request):
         """
         Place order from cart items - creates order and invoice (payment pending)
         POST /api/shopping-cart/place-order/
+        Send an Idempotency-Key header to make retries return the original response.
         """
         user = get_authenticated_user(request)
         
@@ -145,47 +201,56 @@ class ShoppingCartViewSet(viewsets.ViewSet):
                 )
 
         try:
-            cart = ShoppingCartModel.objects.get(user=user)
-            
-            if not cart.items.exists():
-                return Response(
-                    {"error": "Cart is empty"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            with transaction.atomic():
+                # Lock the cart so concurrent cart writes or a second checkout wait until the order is placed
+                cart = ShoppingCartModel.objects.select_for_update().get(user=user)
+                items = list(cart.items.select_related("product"))
 
-            # Check stock availability
-            inventory_manager = InventoryManager()
-            for item in cart.items.all():
-                available_stock = inventory_manager.get_stock(item.product.id)
-                if available_stock is None or available_stock < item.quantity:
+                if not items:
                     return Response(
-                        {"error": f"Insufficient stock for {item.product.name}. Available: {available_stock}, Requested: {item.quantity}"}, 
+                        {"error": "Cart is empty"}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
-            # Create order and reserve stock in a transaction
-            with transaction.atomic():
+                # Reserve stock for every line with one conditional update; nothing is
+                # reserved if any line is short
+                inventory_manager = InventoryManager()
+                quantities = {item.product_id: item.quantity for item in items}
+                shortages = inventory_manager.reserve_stock(quantities)
+                if shortages:
+                    product_id, available_stock, requested = shortages[0]
+                    product_name = next(item.product.name for item in items if item.product_id == product_id)
+                    return Response(
+                        {"error": f"Insufficient stock for {product_name}. Available: {available_stock}, Requested: {requested}"}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                subtotal = sum(item.product.price * item.quantity for item in items)
+
                 # Create order
                 order = OrderModel.objects.create(
                     user=user,
                     payment_status=ORDER_PAYMENT_STATUS.PENDING.value,
+                    subtotal=subtotal,
+                    total=subtotal,
                     **shipping_data
                 )
 
-                # Create order items and reserve stock
-                for item in cart.items.all():
-                    OrderItemModel.objects.create(
+                OrderItemModel.objects.bulk_create([
+                    OrderItemModel(
                         order=order,
                         product=item.product,
                         quantity=item.quantity,
                         price=item.product.price
                     )
-                    
-                    # Reserve stock (reduce from inventory)
-                    inventory_manager.adjust_stock(item.product.id, -item.quantity)
+                    for item in items
+                ])
 
                 invoice = self._create_invoice(order)
 
+                # The stock is held until the invoice is paid or the hold expires
+                inventory_manager.hold_stock(invoice, quantities)
+
                 cart.clear()
 
                 print(f"Order {order.id} placed successfully! Stock reserved, invoice generated.")
@@ -214,10 +279,12 @@ class ShoppingCartViewSet(viewsets.ViewSet):
             )
 
     @action(detail=False, methods=["post"], url_path="pay-invoice")
+    @idempotent
     def pay_invoice(self, request):
         """
         Pay an invoice using wallet - processes payment and generates receipt
         POST /api/shopping-cart/pay-invoice/
+        Send an Idempotency-Key header to make retries return the original response.
         """
         user = get_authenticated_user(request)
         invoice_id = request.data.get("invoice_id")
@@ -229,26 +296,35 @@ class ShoppingCartViewSet(viewsets.ViewSet):
             )
 
         try:
-            # Get invoice and verify ownership
-            invoice = InvoiceModel.objects.get(id=invoice_id, order__user=user)
-            
-            if invoice.status == INVOICE_STATUS.PAID.value:
-                return Response(
-                    {"error": "Invoice has already been paid"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            # Payment, receipt and shipment are written together or not at all
+            with transaction.atomic():
+                # Get invoice and verify ownership
+                invoice = InvoiceModel.objects.select_related("order").get(id=invoice_id, order__user=user)
 
-            payment_result = self._process_payment(invoice, user)
-            
-            if not payment_result["success"]:
-                return Response(
-                    {"error": payment_result["error"]}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                if invoice.status == INVOICE_STATUS.PAID.value:
+                    return Response(
+                        {"error": "Invoice has already been paid"}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                if invoice.status == INVOICE_STATUS.CANCELLED.value:
+                    return Response(
+                        {"error": "Invoice has been cancelled and its stock released"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                payment_result = self._process_payment(invoice, user)
+
+                if not payment_result["success"]:
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"error": payment_result["error"]}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-            # Create shipment after successful payment
-            shipment_manager = ShipmentManager()
-            shipment = shipment_manager.create_shipment(invoice.order)
+                # Create shipment after successful payment
+                shipment_manager = ShipmentManager()
+                shipment = shipment_manager.create_shipment(invoice.order)
 
             return Response({
                 "message": "Payment successful! Your order is now being processed for shipment.",
@@ -279,6 +355,14 @@ class ShoppingCartViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _cart_serializer(self, cart):
+        """Serialize a cart with all items and their products loaded in one query"""
+        prefetch_related_objects(
+            [cart],
+            Prefetch("items", queryset=CartItemModel.objects.select_related("product").order_by("id")),
+        )
+        return ShoppingCartModelSerializer(cart)
+
     def _create_invoice(self, order):
         """Create an invoice for an order"""
         invoice_number = f"INV{uuid.uuid4().hex[:8].upper()}"
@@ -296,52 +380,70 @@ class ShoppingCartViewSet(viewsets.ViewSet):
         return invoice
 
     def _process_payment(self, invoice, user):
-        """Process wallet payment for an invoice"""
+        """
+        Process wallet payment for an invoice. Must run inside a transaction: the
+        invoice is claimed and the wallet debited with conditional updates, so
+        concurrent payments can neither pay an invoice twice nor overdraw the wallet.
+        """
         transaction_id = f"TXN{uuid.uuid4().hex[:10].upper()}"
-        
-        if user.wallet < invoice.amount_due:
+        now = timezone.now()
+
+        # Claim the invoice; a concurrent payment of it waits here and then finds it paid
+        claimed = InvoiceModel.objects.filter(
+            pk=invoice.pk,
+            status__in=[INVOICE_STATUS.PENDING.value, INVOICE_STATUS.OVERDUE.value]
+        ).update(status=INVOICE_STATUS.PAID.value, updated_at=now)
+        if not claimed:
             return {
                 "success": False,
-                "error": f"Insufficient wallet balance. Required: ${invoice.amount_due}, Available: ${user.wallet}"
+                "error": "Invoice has already been paid or cancelled"
             }
-        
-        try:
-            # Create payment record
-            payment = PaymentModel.objects.create(
-                invoice=invoice,
-                user=user,
-                amount=invoice.amount_due,
-                transaction_id=transaction_id
-            )
-            
-            # Deduct from wallet
-            user.wallet -= invoice.amount_due
-            user.save()
-            
-            payment.mark_as_completed()
-            
-            invoice.mark_as_paid()
-            
-            order = invoice.order
-            order.payment_status = ORDER_PAYMENT_STATUS.PAID.value
-            order.save()
-            
-            receipt = self._generate_receipt(payment)
-            
-            print(f"Payment {transaction_id} completed for Invoice {invoice.invoice_number}")
-            
-            return {
-                "success": True,
-                "payment": payment,
-                "receipt": receipt
-            }
-            
-        except Exception as e:
-            print(f"Payment failed: {str(e)}")
+
+        debited = WalletManager().adjust(
+            user,
+            -invoice.amount_due,
+            WALLET_TRANSACTION_TYPE.PAYMENT,
+            reference=invoice.invoice_number
+        )
+        if debited is None:
+            available = UserModel.objects.filter(pk=user.pk).values_list("wallet", flat=True).first()
             return {
                 "success": False,
-                "error": f"Payment processing failed: {str(e)}"
+                "error": f"Insufficient wallet balance. Required: ${invoice.amount_due}, Available: ${available}"
             }
+        invoice.status = INVOICE_STATUS.PAID.value
+        invoice.updated_at = now
+
+        payment = PaymentModel.objects.create(
+            invoice=invoice,
+            user=user,
+            amount=invoice.amount_due,
+            transaction_id=transaction_id,
+            status=PAYMENT_STATUS.COMPLETED.value,
+            completed_at=now
+        )
+
+        order = invoice.order
+        order.payment_status = ORDER_PAYMENT_STATUS.PAID.value
+        order.save(update_fields=["payment_status"])
+
+        InventoryManager().consume_reservations(invoice)
+
+        receipt = self._generate_receipt(payment)
+
+        publish_event("order.payment_status", {
+            "order_id": order.id,
+            "invoice_number": invoice.invoice_number,
+            "payment_status": order.payment_status,
+        }, user_id=user.pk)
+
+        print(f"Payment {transaction_id} completed for Invoice {invoice.invoice_number}")
+
+        return {
+            "success": True,
+            "payment": payment,
+            "receipt": receipt
+        }
 
     def _generate_receipt(self, payment):
         """Generate a receipt for a completed payment"""
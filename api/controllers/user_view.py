@@ -1,20 +1,23 @@
-from django.shortcuts import get_object_or_404
-
 from rest_framework import viewsets, status
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 
-from api.permissions import HasRolePermission, get_authenticated_user
-from api.serializers import UserModelSerializer
+from api.permissions import HasRolePermission, get_access_token_claims, get_authenticated_user
+from api.tokens import issue_tokens, revoke_token, revoke_user_tokens, verify_refresh_token
+from api.pagination import KeysetPagination
+from api.serializers import UserModelSerializer, WalletTransactionModelSerializer
 
 from base.enums import ROLE
-from base.models import UserModel
+from base.models import UserModel, WalletTransactionModel
 
 class UserViewSet(viewsets.ViewSet):
+    cursor_ordering = ("-id",)
+
     def get_permissions(self):
-        if self.action in ["login", "signup"]:
+        if self.action in ["login", "signup", "refresh", "logout"]:
             permission_classes = [AllowAny]
         else:
             permission_classes = []
@@ -60,10 +63,37 @@ class UserViewSet(viewsets.ViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            # A new password ends every session opened with the old one
+            if request.data.get("password"):
+                revoke_user_tokens(user.id)
             return Response(serializer.data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=["get"], url_path="wallet-history")
+    def wallet_history(self, request, pk=None):
+        """
+        Wallet transactions of a user, newest first.
+        GET /api/user/{pk}/wallet-history/?limit=50&cursor=<next cursor>
+        Users can only view their own history; admins can view anyone's.
+        """
+        user = get_object_or_404(UserModel, pk=pk)
+
+        current_user = get_authenticated_user(request)
+        if not current_user:
+            raise PermissionDenied("Authentication required")
+
+        if str(current_user.id) != str(pk) and not HasRolePermission([ROLE.ADMIN]).has_permission(request, self):
+            raise PermissionDenied("You can only view your own wallet history")
+
+        paginator = KeysetPagination()
+        # History is always paged
+        paginator.optional = False
+        page = paginator.paginate_queryset(WalletTransactionModel.objects.filter(user=user), request, view=self)
+        serializer = WalletTransactionModelSerializer(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=["post"])
     def login(self, request):
         """
@@ -83,7 +113,7 @@ class UserViewSet(viewsets.ViewSet):
             user = UserModel.objects.get(username=username)
             if user.password == password:
                 serializer = UserModelSerializer(user)
-                return Response({"user": serializer.data})
+                return Response({"user": serializer.data, **issue_tokens(user)})
             else:
                 return Response(
                     {"error": "Invalid credentials"},
@@ -95,6 +125,73 @@ class UserViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+    @action(detail=False, methods=["post"])
+    def refresh(self, request):
+        """
+        Exchange a refresh token for a new token pair.
+        POST /api/user/refresh/
+        Body: {"refresh": "<refresh token>"}
+        """
+        token = request.data.get("refresh")
+        if not token:
+            return Response(
+                {"error": "refresh is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        verified = verify_refresh_token(token)
+        if verified is None:
+            return Response(
+                {"error": "Invalid or expired refresh token"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        # The user is reloaded during verification, so role changes are picked up by the new access token
+        claims, user = verified
+
+        # Refresh tokens are single use; a concurrent refresh with the same token loses
+        if not revoke_token(claims):
+            return Response(
+                {"error": "Invalid or expired refresh token"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        return Response(issue_tokens(user))
+
+    @action(detail=False, methods=["post"])
+    def logout(self, request):
+        """
+        Revoke the current access token and, if given, the refresh token.
+        POST /api/user/logout/
+        Body: {"refresh": "<refresh token>"} (optional)
+        """
+        access_claims = get_access_token_claims(request)
+        if access_claims is not None:
+            revoke_token(access_claims)
+
+        refresh_token = request.data.get("refresh")
+        if refresh_token:
+            verified = verify_refresh_token(refresh_token)
+            if verified is not None:
+                revoke_token(verified[0])
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"], url_path="revoke-tokens")
+    def revoke_tokens(self, request, pk=None):
+        """
+        Force logout of a user by revoking every token issued to them so far.
+        POST /api/user/{pk}/revoke-tokens/
+        Admin only.
+        """
+        if not HasRolePermission([ROLE.ADMIN]).has_permission(request, self):
+            raise PermissionDenied("Only admin users can revoke tokens")
+
+        user = get_object_or_404(UserModel, pk=pk)
+        revoke_user_tokens(user.id)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=False, methods=["post"])
     def signup(self, request):
         """
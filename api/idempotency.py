@@ -0,0 +1,149 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from base.models import IdempotencyKeyModel
+
+from api.permissions import get_authenticated_user
+
+POLL_INTERVAL = 0.1
+
+def idempotent(view):
+    """
+    Make a ViewSet action safe to retry with an Idempotency-Key header.
+    The first request with a key runs the action and stores its response in the
+    same transaction; retries with the same key and body get the stored response
+    back without running the action again, and retries that arrive while the first
+    attempt is still running wait for it. 5xx responses are not stored, so the
+    request can be retried with the same key.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response(
+                {"error": "Idempotency-Key must be at most 255 characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = get_authenticated_user(request)
+        fingerprint = _fingerprint(request)
+        record, owner = _claim(user, key, request.path, fingerprint)
+
+        if record.fingerprint != fingerprint:
+            return Response(
+                {"error": "Idempotency-Key has already been used for a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        if not owner:
+            record = _wait_for(record)
+            if record is None:
+                return Response(
+                    {"error": "A request with this Idempotency-Key is still being processed"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return _replay(record)
+
+        try:
+            with transaction.atomic():
+                response = view(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    IdempotencyKeyModel.objects.filter(pk=record.pk).update(
+                        response_status=response.status_code,
+                        response_body=json.loads(json.dumps(response.data, cls=JSONEncoder)),
+                    )
+                else:
+                    transaction.set_rollback(True)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+
+        return response
+
+    return wrapper
+
+def _fingerprint(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    payload = json.dumps({"method": request.method, "path": request.path, "data": data}, sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _claim(user, key, endpoint, fingerprint):
+    """
+    Return (record, owner) for the key. `owner` is True when this request created
+    the record, or took over an attempt that ran past IDEMPOTENCY_LOCK_TIMEOUT.
+    """
+    ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL", timedelta(hours=24))
+    lock_timeout = timedelta(seconds=getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60))
+
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKeyModel.objects.create(
+                    user=user,
+                    key=key,
+                    endpoint=endpoint,
+                    fingerprint=fingerprint,
+                    locked_at=now,
+                    expires_at=now + ttl,
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKeyModel.objects.filter(user=user, key=key).first()
+        if record is None:
+            # Removed between the insert and the read; try again
+            continue
+
+        if record.expires_at <= now:
+            IdempotencyKeyModel.objects.filter(pk=record.pk, expires_at=record.expires_at).delete()
+            continue
+
+        if not record.is_completed and record.fingerprint == fingerprint and record.locked_at <= now - lock_timeout:
+            taken_over = IdempotencyKeyModel.objects.filter(
+                pk=record.pk,
+                response_status__isnull=True,
+                locked_at=record.locked_at
+            ).update(locked_at=now)
+            if taken_over:
+                return record, True
+
+        return record, False
+
+def _wait_for(record):
+    """Poll until the attempt that owns `record` finishes; None if it does not in time"""
+    deadline = time.monotonic() + getattr(settings, "IDEMPOTENCY_WAIT_TIMEOUT", 10)
+    while not record.is_completed:
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKeyModel.objects.filter(pk=record.pk).first()
+        if record is None:
+            # The first attempt failed and released the key
+            return None
+    return record
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response["Idempotent-Replayed"] = "true"
+    return response
@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination driven by ?cursor=&limit=.
+    Requests without either parameter are left unpaginated so existing clients keep
+    receiving a plain list, unless `optional` is False. The ordering comes from the view's `cursor_ordering`
+    and must end in a unique field, e.g. ("name", "id") or ("-created_at", "-id").
+    """
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    default_limit = 50
+    max_limit = 500
+    optional = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor = request.query_params.get(self.cursor_query_param)
+        limit = request.query_params.get(self.limit_query_param)
+        if cursor is None and limit is None and self.optional:
+            return None
+
+        self.request = request
+        self.ordering = tuple(view.cursor_ordering)
+        self.limit = self._parse_limit(limit)
+
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self._decode_cursor(cursor, queryset.model)))
+
+        rows = list(queryset[:self.limit + 1])
+        self.next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            self.next_cursor = self._encode_cursor(rows[-1])
+
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def _parse_limit(self, limit):
+        if limit is None:
+            return self.default_limit
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({"limit": "Limit must be an integer."})
+        if limit <= 0:
+            raise ValidationError({"limit": "Limit must be greater than 0."})
+        return min(limit, self.max_limit)
+
+    def _after(self, values):
+        """
+        Build the keyset predicate for rows strictly after `values` in the ordering.
+        The leading `>=` bound on the first field lets the database seek straight
+        into the supporting index instead of scanning from the start.
+        """
+        fields = [(field.lstrip("-"), field.startswith("-")) for field in self.ordering]
+
+        first_field, first_descending = fields[0]
+        bound = Q(**{f"{first_field}__{'lte' if first_descending else 'gte'}": values[0]})
+
+        after = Q()
+        for index, (field, descending) in enumerate(fields):
+            condition = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[index]})
+            for previous_index in range(index):
+                condition &= Q(**{fields[previous_index][0]: values[previous_index]})
+            after |= condition
+
+        return bound & after
+
+    def _row_values(self, row):
+        values = []
+        for field in self.ordering:
+            field = field.lstrip("-")
+            value = row[field] if isinstance(row, Mapping) else getattr(row, field)
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            elif not isinstance(value, (str, int, float, bool)) and value is not None:
+                value = str(value)
+            values.append(value)
+        return values
+
+    def _encode_cursor(self, row):
+        payload = json.dumps(self._row_values(row), separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    def _decode_cursor(self, cursor, model):
+        """Decode a cursor and parse each value with its ordering field, rejecting anything malformed"""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, binascii.Error):
+            raise ValidationError({"cursor": "Invalid cursor."})
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+        parsed = []
+        for field, value in zip(self.ordering, values):
+            if value is None or isinstance(value, (list, dict)):
+                raise ValidationError({"cursor": "Invalid cursor."})
+            try:
+                parsed.append(model._meta.get_field(field.lstrip("-")).to_python(value))
+            except (ValueError, TypeError, DjangoValidationError):
+                raise ValidationError({"cursor": "Invalid cursor."})
+        return parsed
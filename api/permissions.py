@@ -4,7 +4,11 @@ from rest_framework import permissions
 
 from base.models import UserModel
 
-def get_authenticated_user(request):
+from api.tokens import verify_access_token
+
+_UNRESOLVED = object()
+
+def _authenticate_basic(request):
     auth = request.META.get("HTTP_AUTHORIZATION")
     if not auth or not auth.startswith("Basic "):
         return None
@@ -12,28 +16,67 @@ def get_authenticated_user(request):
         _, encoded = auth.split(" ", 1)
         decoded = base64.b64decode(encoded).decode("utf-8")
         username, password = decoded.split(":", 1)
+
         # Do raw password checking instead of using authenticate
-        try:
-            user = UserModel.objects.get(username=username)
-            if user.password == password:
-                return user
-            return None
-        except UserModel.DoesNotExist:
+        user = UserModel.objects.filter(username=username).first()
+        if user is None or user.password != password:
             return None
+        return user
     except Exception as e:
         return None
 
+def get_access_token_claims(request):
+    """
+    Return the verified claims of the request's Bearer token, or None.
+    Verification (HMAC plus one query that loads the user and checks revocation) is
+    memoized on the underlying HttpRequest, together with the user it loaded.
+    """
+    http_request = getattr(request, "_request", request)
+    claims = getattr(http_request, "_access_token_claims", _UNRESOLVED)
+    if claims is _UNRESOLVED:
+        claims = None
+        auth = http_request.META.get("HTTP_AUTHORIZATION")
+        if auth and auth.startswith("Bearer "):
+            verified = verify_access_token(auth.split(" ", 1)[1].strip())
+            if verified is not None:
+                claims, http_request._authenticated_user = verified
+        http_request._access_token_claims = claims
+    return claims
+
+def get_authenticated_user(request):
+    """
+    Resolve the user behind the request's Bearer token or Basic auth header.
+    The result is memoized on the underlying HttpRequest, so permission checks and
+    views that call this several times per request only authenticate once.
+    """
+    http_request = getattr(request, "_request", request)
+    user = getattr(http_request, "_authenticated_user", _UNRESOLVED)
+    if user is _UNRESOLVED:
+        # A valid Bearer token stores the user it was checked against
+        if get_access_token_claims(http_request) is not None:
+            return http_request._authenticated_user
+        user = _authenticate_basic(http_request)
+        http_request._authenticated_user = user
+    return user
+
 class HasRolePermission(permissions.BasePermission):
     def __init__(self, allowed_roles):
         self.allowed_roles = allowed_roles if isinstance(allowed_roles, list) else [allowed_roles]
 
     def has_permission(self, request, view):
+        allowed = [role.value for role in self.allowed_roles]
+
+        # Token holders are authorized from the signed role claim without loading the user
+        claims = get_access_token_claims(request)
+        if claims is not None:
+            return claims["role"] in allowed
+
         user = get_authenticated_user(request)
         if user:
             return (
                 user.is_authenticated
                 and hasattr(user, "role")
-                and user.role in [role.value for role in self.allowed_roles]
+                and user.role in allowed
             )
-        
+
         return False
@@ -1,7 +1,13 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import QuerySet
+
 from rest_framework import serializers
 
 from base.models import *
-from base.enums import ROLE
+from base.enums import ROLE, SHIPMENT_STATUS
+from base.managers import CategoryRegistry, WalletManager
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
@@ -24,6 +30,14 @@ class ShipmentModelSerializer(serializers.ModelSerializer):
             "order_id",
         ]
         
+class ShipmentStatusUpdateSerializer(serializers.Serializer):
+    tracking_number = serializers.CharField(max_length=50)
+    status = serializers.ChoiceField(choices=[status.value for status in SHIPMENT_STATUS])
+    timestamp = serializers.DateTimeField()
+
+class ShipmentBulkStatusSerializer(serializers.Serializer):
+    updates = ShipmentStatusUpdateSerializer(many=True, allow_empty=False, max_length=5000)
+        
 class InvoiceModelSerializer(serializers.ModelSerializer):
     receipts = serializers.SerializerMethodField()
 
@@ -45,6 +59,7 @@ class ReceiptModelSerializer(serializers.ModelSerializer):
         fields = ["id", "receipt_number", "amount_paid", "created_at"]
 
 class OrderModelSerializer(serializers.ModelSerializer):
+    subtotal = serializers.SerializerMethodField()
     total = serializers.SerializerMethodField()
     items = OrderItemSerializer(many=True, read_only=True)
     shipment = ShipmentModelSerializer(read_only=True, allow_null=True)
@@ -57,6 +72,7 @@ class OrderModelSerializer(serializers.ModelSerializer):
             "created_at",
             "status",
             "payment_status",
+            "subtotal",
             "total",
             "items",
             "shipment",
@@ -67,6 +83,9 @@ class OrderModelSerializer(serializers.ModelSerializer):
             "shipping_postal_code",
         ]
 
+    def get_subtotal(self, obj):
+        return obj.subtotal
+
     def get_total(self, obj):
         return obj.total
 
@@ -108,14 +127,22 @@ class UserModelSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         password = validated_data.pop("password", None)
+        # The wallet only changes through the ledger
+        wallet = validated_data.pop("wallet", None)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
+        update_fields = list(validated_data.keys())
         if password:
             instance.set_password(password)
+            update_fields.append("password")
 
-        instance.save()
+        with transaction.atomic():
+            if update_fields:
+                instance.save(update_fields=update_fields)
+            if wallet is not None:
+                WalletManager().set_balance(instance, wallet)
 
         return instance
 
@@ -127,6 +154,11 @@ class UserModelSerializer(serializers.ModelSerializer):
 
         return user
 
+class WalletTransactionModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WalletTransactionModel
+        fields = ["id", "amount", "balance_after", "kind", "reference", "created_at"]
+
 class CategoryModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = CategoryModel
@@ -144,16 +176,7 @@ class ProductModelSerializer(serializers.ModelSerializer):
         category_id = validated_data.pop("category_id", None)
 
         if category_id:
-            try:
-                category = CategoryModel.objects.get(id=category_id)
-                validated_data["category"] = category
-            except CategoryModel.DoesNotExist:
-                try:
-                    category = CategoryModel.objects.get(name=category_id)
-                    validated_data["category"] = category
-                except CategoryModel.DoesNotExist:
-                    raise serializers.ValidationError(f"Category '{category_id}' not found")
-
+            validated_data["category"] = self._resolve_category(category_id)
 
         return super().create(validated_data)
     
@@ -161,18 +184,90 @@ class ProductModelSerializer(serializers.ModelSerializer):
         category_id = validated_data.pop("category_id", None)
 
         if category_id:
-            try:
-                category = CategoryModel.objects.get(id=category_id)
-                validated_data["category"] = category
-            except CategoryModel.DoesNotExist:
-                try:
-                    category = CategoryModel.objects.get(name=category_id)
-                    validated_data["category"] = category
-                except CategoryModel.DoesNotExist:
-                    raise serializers.ValidationError(f"Category '{category_id}' not found")
+            validated_data["category"] = self._resolve_category(category_id)
                 
         return super().update(instance, validated_data)
 
+    def _resolve_category(self, category_id):
+        """Resolve a category by id, then by name, from the in-process registry"""
+        category = CategoryRegistry().get(category_id)
+        if category is None:
+            raise serializers.ValidationError(f"Category '{category_id}' not found")
+        return category
+
+class ProductReadSerializer:
+    """
+    Read-only fast path for product lists and detail.
+    Renders rows from ProductModel .values() with the exact JSON shape of
+    ProductModelSerializer (including leaving out "category" when there is none),
+    without DRF's per-field serialization.
+    """
+    VALUES = ("id", "name", "description", "price", "stock", "category__name", "is_active")
+    PRICE_QUANTUM = Decimal("0.01")
+
+    def __init__(self, instance, many=False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def rows(cls, queryset):
+        return queryset.values(*cls.VALUES)
+
+    @classmethod
+    def to_representation(cls, row):
+        data = {
+            "id": str(row["id"]),
+            "name": row["name"],
+            "description": row["description"],
+            "price": "{:f}".format(row["price"].quantize(cls.PRICE_QUANTUM)),
+            "stock": row["stock"],
+        }
+        if row["category__name"] is not None:
+            data["category"] = row["category__name"]
+        data["is_active"] = row["is_active"]
+        return data
+
+    @property
+    def data(self):
+        if not self.many:
+            return self.to_representation(self.instance)
+
+        rows = self.instance
+        if isinstance(rows, QuerySet):
+            rows = self.rows(rows)
+        return [self.to_representation(row) for row in rows]
+
+class ProductValuesSerializer(serializers.Serializer):
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+    description = serializers.CharField(max_length=255, required=False)
+
+class ProductPatchSerializer(ProductValuesSerializer):
+    id = serializers.UUIDField()
+
+class ProductFilterSerializer(serializers.Serializer):
+    categories = serializers.ListField(child=serializers.CharField(), required=False)
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Filter must include categories or ids")
+        return attrs
+
+class ProductBulkUpdateSerializer(serializers.Serializer):
+    """Either a list of per-product patches, or one set of values applied to a filter"""
+    patches = ProductPatchSerializer(many=True, required=False)
+    filter = ProductFilterSerializer(required=False)
+    set = ProductValuesSerializer(required=False)
+
+    def validate(self, attrs):
+        if "patches" in attrs:
+            if "filter" in attrs or "set" in attrs:
+                raise serializers.ValidationError("Use either patches or filter with set, not both")
+        elif "filter" not in attrs or not attrs.get("set"):
+            raise serializers.ValidationError("Provide patches, or both filter and set")
+        return attrs
+
 class CartItemModelSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
     product_price = serializers.DecimalField(source="product.price", max_digits=10, decimal_places=2, read_only=True)
@@ -191,6 +286,23 @@ class CartItemModelSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Quantity must be greater than 0")
         return value
 
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["add", "set", "remove"])
+    product_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] == "remove":
+            return attrs
+        if "quantity" not in attrs:
+            raise serializers.ValidationError({"quantity": f"quantity is required for {attrs['op']}"})
+        if attrs["op"] == "add" and attrs["quantity"] <= 0:
+            raise serializers.ValidationError({"quantity": "Quantity must be greater than 0"})
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=500)
+
 class ShoppingCartModelSerializer(serializers.ModelSerializer):
     items = CartItemModelSerializer(many=True, read_only=True)
     total = serializers.SerializerMethodField()
@@ -205,4 +317,4 @@ class ShoppingCartModelSerializer(serializers.ModelSerializer):
         return obj.total
 
     def get_total_items(self, obj):
-        return obj.total_items
+        return obj.item_count
@@ -0,0 +1,715 @@
+import asyncio
+import base64
+import importlib
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from base.enums import INVOICE_STATUS, RESERVATION_STATUS, ROLE
+from base.events import get_broker
+from base.managers import CartManager, CategoryRegistry, InventoryManager, ShipmentManager, WalletManager
+from base.models import CartItemModel, CatalogVersionModel, CategoryModel, IdempotencyKeyModel, InvoiceModel, OrderModel, PaymentModel, ProductModel, ReceiptModel, ShipmentModel, ShoppingCartModel, StockReservationModel, UserModel
+
+from api.controllers.shopping_cart_view import ShoppingCartViewSet
+from api.tokens import issue_tokens
+
+def basic_auth(username, password):
+    return "Basic " + base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+def create_user(username, role=ROLE.CUSTOMER, password="secret", wallet=0):
+    return UserModel.objects.create(
+        username=username,
+        email=f"{username}@example.com",
+        firstName=username,
+        lastName="Test",
+        password=password,
+        role=role.value,
+        wallet=wallet,
+    )
+
+class BasicAuthTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user("alice")
+
+    def test_password_changed_elsewhere_rejects_old_credentials(self):
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("alice", "secret"))
+        self.assertEqual(self.client.get(f"/api/user/{self.user.id}/").status_code, 200)
+
+        # Another process changes the password
+        UserModel.objects.filter(pk=self.user.pk).update(password="changed")
+
+        self.assertEqual(self.client.get(f"/api/user/{self.user.id}/").status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("alice", "changed"))
+        self.assertEqual(self.client.get(f"/api/user/{self.user.id}/").status_code, 200)
+
+    def test_request_authenticates_with_one_query(self):
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("alice", "secret"))
+        # The user lookup, then the cart; the role check reuses the memoized user
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/shopping-cart/summary/").status_code, 200)
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user("bob")
+        self.admin = create_user("root", role=ROLE.ADMIN)
+
+    def login(self, username):
+        response = self.client.post("/api/user/login/", {"username": username, "password": "secret"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def profile_status(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        status_code = self.client.get(f"/api/user/{self.user.id}/").status_code
+        self.client.credentials()
+        return status_code
+
+    def test_logout_revokes_access_token(self):
+        tokens = self.login("bob")
+        self.assertEqual(self.profile_status(tokens["access"]), 200)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.post("/api/user/logout/", {"refresh": tokens["refresh"]}, format="json").status_code, 204)
+        self.client.credentials()
+
+        self.assertEqual(self.profile_status(tokens["access"]), 403)
+        self.assertEqual(self.client.post("/api/user/refresh/", {"refresh": tokens["refresh"]}, format="json").status_code, 401)
+
+    def test_forced_revocation_is_stored_with_the_user(self):
+        tokens = self.login("bob")
+        admin_tokens = self.login("root")
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {admin_tokens['access']}")
+        self.assertEqual(self.client.post(f"/api/user/{self.user.id}/revoke-tokens/").status_code, 204)
+        self.client.credentials()
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.tokens_valid_after)
+        self.assertEqual(self.profile_status(tokens["access"]), 403)
+        self.assertEqual(self.profile_status(self.login("bob")["access"]), 200)
+
+    def test_refresh_token_is_single_use(self):
+        tokens = self.login("bob")
+
+        response = self.client.post("/api/user/refresh/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post("/api/user/refresh/", {"refresh": tokens["refresh"]}, format="json").status_code, 401)
+
+    def test_token_request_authenticates_with_one_query(self):
+        access = issue_tokens(self.user)["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        # Verification loads the user along with the revocation check, then the cart
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/shopping-cart/summary/").status_code, 200)
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user("carol")
+        for index in range(3):
+            ProductModel.objects.create(name=f"Product {index}", description="Test", price="1.00", stock=1)
+            OrderModel.objects.create(
+                user=self.user,
+                shipping_full_name="Carol Test",
+                shipping_address="1 Test St",
+                shipping_city="Melbourne",
+                shipping_postal_code="3000",
+            )
+
+    def test_pages_follow_the_next_cursor(self):
+        response = self.client.get("/api/product/?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product["name"] for product in response.data["results"]], ["Product 0", "Product 1"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual([product["name"] for product in response.data["results"]], ["Product 2"])
+        self.assertIsNone(response.data["next"])
+
+    def test_product_cursor_with_invalid_id_is_rejected(self):
+        response = self.client.get(f"/api/product/?cursor={encode_cursor(['Product 0', 'not-a-uuid'])}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_cursor_with_invalid_date_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("carol", "secret"))
+        response = self.client.get(f"/api/order/?cursor={encode_cursor(['not-a-date', 1])}")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(f"/api/order/?cursor={encode_cursor([{'created_at': 1}, 1])}")
+        self.assertEqual(response.status_code, 400)
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        ProductModel.objects.create(name="Claw Hammer", description="Steel hammer", price="20.00", stock=5)
+        ProductModel.objects.create(name="Sledge Hammer", description="Heavy", price="45.00", stock=5)
+        ProductModel.objects.create(name="Hammer Drill", description="Cordless", price="99.00", stock=5, is_active=False)
+        ProductModel.objects.create(name="Screwdriver", description="Flat head", price="5.00", stock=5)
+
+    def test_search_filters_ranks_and_limits(self):
+        response = self.client.get("/api/product/search/?q=hammer")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(product["name"] for product in response.data), ["Claw Hammer", "Sledge Hammer"])
+
+        response = self.client.get("/api/product/search/?q=hammer&limit=1")
+        self.assertEqual([product["name"] for product in response.data], ["Claw Hammer"])
+
+    def test_search_in_unknown_category_is_empty(self):
+        response = self.client.get("/api/product/search/?q=hammer&categories=missing")
+        self.assertEqual(response.data, [])
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Versions restart with each test's rolled back database
+        CategoryRegistry().invalidate()
+        self.client = APIClient()
+        self.product = ProductModel.objects.create(name="Lamp", description="Desk lamp", price="30.00", stock=2)
+
+    def test_version_bumped_by_another_process_invalidates_cached_responses(self):
+        response = self.client.get("/api/product/")
+        etag = response["ETag"]
+        self.assertEqual(self.client.get("/api/product/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Another process writes a product and bumps the shared version
+        ProductModel.objects.filter(pk=self.product.pk).update(name="Floor lamp")
+        CatalogVersionModel.objects.filter(pk=1).update(version=F("version") + 1)
+
+        response = self.client.get("/api/product/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["name"], "Floor lamp")
+
+    def test_category_created_by_another_process_is_listed_and_filterable(self):
+        self.assertEqual(self.client.get("/api/category/").data, [])
+        self.assertEqual(self.client.get("/api/product/?categories=garden").data, [])
+
+        # Another process adds a category and bumps the shared version; this process's registry is not told
+        CategoryModel.objects.bulk_create([CategoryModel(id="garden", name="Garden", description="Garden tools")])
+        ProductModel.objects.filter(pk=self.product.pk).update(category="garden")
+        CatalogVersionModel.objects.filter(pk=1).update(version=F("version") + 1)
+
+        self.assertEqual([category["id"] for category in self.client.get("/api/category/").data], ["garden"])
+        response = self.client.get("/api/product/?categories=garden")
+        self.assertEqual([product["id"] for product in response.data], [str(self.product.id)])
+
+    def test_bump_after_commit_increments_the_version(self):
+        version = CatalogVersionModel.objects.get(pk=1).version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = "35.00"
+            self.product.save()
+        self.assertEqual(CatalogVersionModel.objects.get(pk=1).version, version + 1)
+
+    @override_settings(ALLOWED_HOSTS=["shop.example.com", "admin.example.com"])
+    def test_cached_pages_are_kept_apart_per_host(self):
+        ProductModel.objects.create(name="Mirror", description="Wall mirror", price="15.00", stock=2)
+
+        first = self.client.get("/api/product/?limit=1", HTTP_HOST="shop.example.com")
+        second = self.client.get("/api/product/?limit=1", HTTP_HOST="admin.example.com")
+        self.assertTrue(first.data["next"].startswith("http://shop.example.com/"))
+        self.assertTrue(second.data["next"].startswith("http://admin.example.com/"))
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        create_user("root", role=ROLE.ADMIN)
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("root", "secret"))
+        CategoryModel.objects.create(name="Garden", description="Garden tools")
+        CategoryRegistry().invalidate()
+        self.spade = ProductModel.objects.create(name="Spade", description="Steel spade", price="20.00", stock=3)
+
+    def import_products(self, body, content_type):
+        return self.client.post("/api/product/import/", body, content_type=content_type)
+
+    def test_csv_rows_are_imported_and_bad_rows_reported(self):
+        body = (
+            "name,description,price,stock,category_id,is_active\n"
+            "Rake,Leaf rake,12.50,4,Garden,true\n"
+            "Hose,Garden hose,abc,1,,\n"
+            ",No name,1.00,1,,\n"
+            "Pot,Clay pot,3.00,10,garden,no\n"
+        )
+        response = self.import_products(body, "text/csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["imported"], response.data["failed"]), (2, 2))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 4])
+        self.assertIn("price", response.data["errors"][0]["error"])
+
+        rake = ProductModel.objects.get(name="Rake")
+        self.assertEqual((rake.price, rake.stock, rake.category_id, rake.is_active), (Decimal("12.50"), 4, "garden", True))
+        self.assertFalse(ProductModel.objects.get(name="Pot").is_active)
+
+    def test_ndjson_upserts_by_id(self):
+        body = "\n".join([
+            json.dumps({"id": str(self.spade.id), "name": "Spade", "description": "Steel spade", "price": "18.00", "stock": 7}),
+            "{not json",
+            json.dumps({"name": "Trowel", "description": "Hand trowel", "price": "6.00", "category_id": "missing"}),
+            json.dumps({"name": "Shears", "description": "Pruning shears", "price": "15.00"}),
+        ])
+        response = self.import_products(body, "application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["imported"], response.data["failed"]), (2, 2))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+
+        self.spade.refresh_from_db()
+        self.assertEqual((self.spade.price, self.spade.stock), (Decimal("18.00"), 7))
+        self.assertEqual(ProductModel.objects.filter(name="Spade").count(), 1)
+        self.assertTrue(ProductModel.objects.filter(name="Shears").exists())
+
+    def test_unsupported_content_type_and_non_admins_are_refused(self):
+        self.assertEqual(self.import_products("{}", "application/json").status_code, 415)
+
+        create_user("dan")
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("dan", "secret"))
+        self.assertEqual(self.import_products("name\nRake\n", "text/csv").status_code, 403)
+
+class ProductBulkUpdateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        create_user("root", role=ROLE.ADMIN)
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("root", "secret"))
+        CategoryModel.objects.bulk_create([CategoryModel(id="garden", name="Garden", description="Garden tools")])
+        CategoryRegistry().invalidate()
+        self.rake = ProductModel.objects.create(name="Rake", description="Rake", price="12.00", stock=3, category_id="garden")
+        self.hose = ProductModel.objects.create(name="Hose", description="Hose", price="25.00", stock=3, category_id="garden")
+        self.lamp = ProductModel.objects.create(name="Lamp", description="Lamp", price="30.00", stock=3)
+
+    def bulk_update(self, body):
+        return self.client.post("/api/product/bulk-update/", body, format="json")
+
+    def test_patches_update_only_the_given_columns(self):
+        missing = ProductModel(name="Gone", description="Gone", price="1.00")
+        response = self.bulk_update({"patches": [
+            {"id": str(self.rake.id), "price": "10.00"},
+            {"id": str(self.hose.id), "price": "20.00", "is_active": False},
+            {"id": str(missing.id), "price": "5.00"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["matched"], 2)
+        self.assertEqual(response.data["updated"], {"price": 2, "is_active": 1})
+        self.assertEqual(response.data["not_found"], [str(missing.id)])
+
+        prices = dict(ProductModel.objects.values_list("name", "price"))
+        self.assertEqual(prices, {"Rake": Decimal("10.00"), "Hose": Decimal("20.00"), "Lamp": Decimal("30.00")})
+        self.assertEqual(list(ProductModel.objects.filter(is_active=False).values_list("name", flat=True)), ["Hose"])
+
+    def test_price_set_by_filter_reprices_carts(self):
+        cart = ShoppingCartModel.objects.create(user=create_user("kim"))
+        CartManager().add_item(cart, ProductModel.objects.get(pk=self.rake.pk), 2)
+
+        response = self.bulk_update({"filter": {"ids": [str(self.rake.id)]}, "set": {"price": "9.00"}})
+        self.assertEqual(response.status_code, 200)
+        cart.refresh_from_db()
+        self.assertEqual((cart.total, cart.item_count), (Decimal("18.00"), 2))
+
+    def test_filter_sets_values_on_every_match(self):
+        response = self.bulk_update({"filter": {"categories": ["garden"]}, "set": {"is_active": False}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"matched": 2, "updated": {"is_active": 2}, "not_found": []})
+        self.assertTrue(ProductModel.objects.get(pk=self.lamp.pk).is_active)
+
+    def test_invalid_bodies_are_rejected(self):
+        self.assertEqual(self.bulk_update({}).status_code, 400)
+        self.assertEqual(self.bulk_update({"filter": {"categories": ["garden"]}}).status_code, 400)
+        self.assertEqual(self.bulk_update({"patches": [{"id": "not-a-uuid", "price": "1.00"}]}).status_code, 400)
+        self.assertEqual(self.bulk_update({"patches": [{"id": str(self.rake.id), "price": "-1.00"}]}).status_code, 400)
+
+@override_settings(PRODUCT_PRICE_BUCKETS=[0, 10, 25])
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        CategoryModel.objects.bulk_create([
+            CategoryModel(id="garden", name="Garden", description="Garden tools"),
+            CategoryModel(id="lighting", name="Lighting", description="Lamps"),
+        ])
+        CategoryRegistry().invalidate()
+        ProductModel.objects.create(name="Rake", description="Rake", price="9.99", stock=3, category_id="garden")
+        ProductModel.objects.create(name="Hose", description="Hose", price="10.00", stock=0, category_id="garden")
+        ProductModel.objects.create(name="Lamp", description="Lamp", price="30.00", stock=2, category_id="lighting")
+        ProductModel.objects.create(name="Gift card", description="Gift card", price="25.00", stock=5)
+        ProductModel.objects.create(name="Old lamp", description="Old lamp", price="5.00", stock=1, category_id="lighting", is_active=False)
+
+    def test_counts_per_category_price_range_and_availability(self):
+        response = self.client.get("/api/product/facets/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], 4)
+        self.assertEqual(
+            [(category["id"], category["count"]) for category in response.data["categories"]],
+            [("garden", 2), ("lighting", 1), (None, 1)]
+        )
+        self.assertEqual(response.data["price_ranges"], [
+            {"min": "0", "max": "10", "count": 1},
+            {"min": "10", "max": "25", "count": 1},
+            {"min": "25", "max": None, "count": 2},
+        ])
+        self.assertEqual(response.data["availability"], {"in_stock": 3, "out_of_stock": 1})
+
+    def test_category_filter_and_inactive_products(self):
+        response = self.client.get("/api/product/facets/?categories=lighting")
+        self.assertEqual((response.data["total"], response.data["categories"]), (1, [{"id": "lighting", "name": "Lighting", "count": 1}]))
+
+        # include_inactive is ignored for anyone but admins
+        self.assertEqual(self.client.get("/api/product/facets/?include_inactive=true").data["total"], 4)
+
+        create_user("root", role=ROLE.ADMIN)
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("root", "secret"))
+        response = self.client.get("/api/product/facets/?include_inactive=true")
+        self.assertEqual((response.data["total"], response.data["price_ranges"][0]["count"]), (5, 2))
+
+class CartUpdateItemTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user("erin")
+        self.product = ProductModel.objects.create(name="Mug", description="Mug", price="4.00", stock=10)
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("erin", "secret"))
+        self.assertEqual(self.client.post("/api/shopping-cart/", {"product_id": str(self.product.id), "quantity": 2}, format="json").status_code, 201)
+
+    def update_item(self, quantity):
+        return self.client.put("/api/shopping-cart/update-item/", {"product_id": str(self.product.id), "quantity": quantity}, format="json")
+
+    def test_non_integer_quantities_are_rejected(self):
+        for quantity in [2.5, "2.5", "two", True, [1]]:
+            self.assertEqual(self.update_item(quantity).status_code, 400, quantity)
+
+        cart = ShoppingCartModel.objects.get(user=self.user)
+        self.assertEqual((cart.total, cart.item_count), (8, 2))
+
+    def test_numeric_string_updates_totals(self):
+        response = self.update_item("3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["total"], response.data["total_items"]), (12, 3))
+
+    def test_zero_quantity_removes_the_line(self):
+        response = self.update_item(0)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CartItemModel.objects.filter(product=self.product).exists())
+        self.assertEqual((response.data["total"], response.data["total_items"]), (0, 0))
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user("gina")
+        self.mug = ProductModel.objects.create(name="Mug", description="Mug", price="4.00", stock=10)
+        self.pen = ProductModel.objects.create(name="Pen", description="Pen", price="1.50", stock=10)
+        self.book = ProductModel.objects.create(name="Book", description="Book", price="10.00", stock=10)
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("gina", "secret"))
+        self.assertEqual(self.client.post("/api/shopping-cart/", {"product_id": str(self.mug.id), "quantity": 2}, format="json").status_code, 201)
+
+    def batch(self, *operations):
+        return self.client.post("/api/shopping-cart/batch/", {"operations": [
+            {"op": op, "product_id": str(product.id), **({"quantity": quantity} if quantity is not None else {})}
+            for op, product, quantity in operations
+        ]}, format="json")
+
+    def quantities(self):
+        return dict(CartItemModel.objects.filter(cart__user=self.user).values_list("product_id", "quantity"))
+
+    def test_operations_apply_in_order(self):
+        response = self.batch(
+            ("add", self.pen, 2),
+            ("set", self.pen, 5),
+            ("add", self.pen, 1),
+            ("remove", self.mug, None),
+            ("add", self.mug, 3),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {self.pen.id: 6, self.mug.id: 3})
+
+    def test_set_to_zero_removes_the_line(self):
+        response = self.batch(("add", self.pen, 1), ("set", self.mug, 0), ("remove", self.book, None))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {self.pen.id: 1})
+        self.assertEqual([item["product"] for item in response.data["items"]], [self.pen.id])
+
+    def test_unknown_product_fails_the_whole_batch(self):
+        missing = ProductModel(name="Gone", description="Gone", price="1.00")
+        response = self.batch(("add", self.pen, 1), ("add", missing, 1))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["product_ids"], [str(missing.id)])
+        self.assertEqual(self.quantities(), {self.mug.id: 2})
+
+    def test_stored_totals_match_the_final_cart(self):
+        response = self.batch(("add", self.book, 1), ("set", self.mug, 3), ("add", self.pen, 4))
+        self.assertEqual((response.data["total"], response.data["total_items"]), (Decimal("28.00"), 8))
+
+        cart = ShoppingCartModel.objects.get(user=self.user)
+        self.assertEqual((cart.total, cart.item_count), (Decimal("28.00"), 8))
+        self.assertEqual(CartManager().reconcile(), 0)
+
+class WalletHistoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user("frank")
+        self.admin = create_user("admin", role=ROLE.ADMIN)
+
+    def test_unknown_or_malformed_user_is_not_found(self):
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("admin", "secret"))
+        self.assertEqual(self.client.get("/api/user/not-a-uuid/wallet-history/").status_code, 404)
+        self.assertEqual(self.client.get("/api/user/00000000-0000-0000-0000-000000000000/wallet-history/").status_code, 404)
+
+    def test_history_lists_wallet_changes_newest_first(self):
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("frank", "secret"))
+        self.assertEqual(self.client.put(f"/api/user/{self.user.id}/", {"wallet": "50.00"}, format="json").status_code, 200)
+        self.assertEqual(self.client.put(f"/api/user/{self.user.id}/", {"wallet": "20.00"}, format="json").status_code, 200)
+
+        response = self.client.get(f"/api/user/{self.user.id}/wallet-history/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["balance_after"] for entry in response.data["results"]], ["20.00", "50.00"])
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.user = create_user("heidi")
+
+    def test_wsgi_requests_are_refused(self):
+        response = APIClient().get("/api/events/", HTTP_AUTHORIZATION=basic_auth("heidi", "secret"))
+        self.assertEqual(response.status_code, 501)
+
+    async def test_asgi_stream_requires_authentication(self):
+        response = await AsyncClient().get("/api/events/")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_asgi_stream_delivers_the_users_events(self):
+        access = issue_tokens(self.user)["access"]
+        response = await AsyncClient().get("/api/events/", headers={"authorization": f"Bearer {access}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await asyncio.wait_for(anext(chunks), 5)).startswith(b"retry:"))
+
+        broker = get_broker()
+        broker.publish("shipment.status", {"status": "shipped"}, user_id="someone-else")
+        event = broker.publish("shipment.status", {"status": "delivered"}, user_id=self.user.id)
+
+        chunk = await asyncio.wait_for(anext(chunks), 5)
+        self.assertIn(f"id: {event['id']}".encode("utf-8"), chunk)
+        self.assertIn(b'"delivered"', chunk)
+        await chunks.aclose()
+
+class CheckoutTestCase(TestCase):
+    """A customer with a funded wallet and a cart of two products"""
+    shipping = {"full_name": "Ivan Test", "address": "1 Test St", "city": "Melbourne", "postal_code": "3000"}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user("ivan")
+        WalletManager().set_balance(self.user, 100)
+        self.lamp = ProductModel.objects.create(name="Lamp", description="Lamp", price="12.50", stock=5)
+        self.cable = ProductModel.objects.create(name="Cable", description="Cable", price="3.25", stock=10)
+
+        self.client.credentials(HTTP_AUTHORIZATION=basic_auth("ivan", "secret"))
+        self.add_to_cart(self.lamp, 2)
+        self.add_to_cart(self.cable, 4)
+
+    def add_to_cart(self, product, quantity):
+        response = self.client.post("/api/shopping-cart/", {"product_id": str(product.id), "quantity": quantity}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def place_order(self, key=None, **data):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post("/api/shopping-cart/place-order/", {**self.shipping, **data}, format="json", **headers)
+
+    def pay_invoice(self, invoice_id, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post("/api/shopping-cart/pay-invoice/", {"invoice_id": invoice_id}, format="json", **headers)
+
+class PaymentTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.invoice_id = self.place_order().data["invoice"]["id"]
+
+    def wallet(self):
+        return UserModel.objects.values_list("wallet", flat=True).get(pk=self.user.pk)
+
+    def assertUnpaid(self):
+        self.assertEqual(InvoiceModel.objects.get(pk=self.invoice_id).status, INVOICE_STATUS.PENDING.value)
+        self.assertFalse(PaymentModel.objects.exists())
+        self.assertFalse(ReceiptModel.objects.exists())
+        self.assertFalse(ShipmentModel.objects.exists())
+        statuses = set(StockReservationModel.objects.filter(invoice_id=self.invoice_id).values_list("status", flat=True))
+        self.assertEqual(statuses, {RESERVATION_STATUS.ACTIVE.value})
+
+    def test_payment_receipt_and_shipment_are_written_together(self):
+        response = self.pay_invoice(self.invoice_id)
+        self.assertEqual(response.status_code, 200)
+
+        payment = PaymentModel.objects.get(invoice_id=self.invoice_id)
+        self.assertEqual(payment.amount, Decimal("38.00"))
+        self.assertEqual(ReceiptModel.objects.get(payment=payment).receipt_number, response.data["receipt"]["receipt_number"])
+        self.assertEqual(ShipmentModel.objects.get(order_id=payment.invoice.order_id).tracking_number, response.data["shipment"]["tracking_number"])
+        self.assertEqual(InvoiceModel.objects.get(pk=self.invoice_id).status, INVOICE_STATUS.PAID.value)
+        self.assertEqual(self.wallet(), Decimal("62.00"))
+
+    def test_insufficient_balance_rolls_back_the_invoice_claim(self):
+        WalletManager().set_balance(self.user, 10)
+
+        response = self.pay_invoice(self.invoice_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Insufficient wallet balance", response.data["error"])
+        self.assertUnpaid()
+        self.assertEqual(self.wallet(), Decimal("10.00"))
+
+        # The invoice can still be paid once the wallet is topped up
+        WalletManager().set_balance(self.user, 50)
+        self.assertEqual(self.pay_invoice(self.invoice_id).status_code, 200)
+
+    def test_failure_after_the_debit_rolls_back_the_payment(self):
+        with mock.patch.object(ShipmentManager, "create_shipment", side_effect=RuntimeError("carrier down")):
+            self.assertEqual(self.pay_invoice(self.invoice_id).status_code, 500)
+
+        self.assertUnpaid()
+        self.assertEqual(self.wallet(), Decimal("100.00"))
+
+    def test_invoice_is_paid_only_once(self):
+        # Read before another request pays it, as a concurrent payment would have
+        stale_invoice = InvoiceModel.objects.select_related("order").get(pk=self.invoice_id)
+        self.assertEqual(self.pay_invoice(self.invoice_id).status_code, 200)
+
+        with transaction.atomic():
+            result = ShoppingCartViewSet()._process_payment(stale_invoice, self.user)
+        self.assertFalse(result["success"])
+        self.assertEqual(self.pay_invoice(self.invoice_id).status_code, 400)
+
+        self.assertEqual(PaymentModel.objects.filter(invoice_id=self.invoice_id).count(), 1)
+        self.assertEqual(self.wallet(), Decimal("62.00"))
+
+class IdempotencyTests(CheckoutTestCase):
+    def test_place_order_retry_replays_the_first_response(self):
+        first = self.place_order(key="order-1")
+        self.assertEqual(first.status_code, 201)
+
+        retry = self.place_order(key="order-1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["order_id"], first.data["order_id"])
+
+        self.assertEqual(OrderModel.objects.filter(user=self.user).count(), 1)
+        self.lamp.refresh_from_db()
+        self.assertEqual(self.lamp.stock, 3)
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.assertEqual(self.place_order(key="order-1").status_code, 201)
+        self.assertEqual(self.place_order(key="order-1", city="Sydney").status_code, 422)
+
+    def test_pay_invoice_retry_debits_the_wallet_once(self):
+        invoice_id = self.place_order().data["invoice"]["id"]
+
+        first = self.pay_invoice(invoice_id, key="pay-1")
+        self.assertEqual(first.status_code, 200)
+        retry = self.pay_invoice(invoice_id, key="pay-1")
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["payment"], first.data["payment"])
+
+        self.assertEqual(PaymentModel.objects.filter(invoice_id=invoice_id).count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet, Decimal("62.00"))
+
+    def test_failed_attempt_is_stored_and_replayed(self):
+        # Client errors are final answers for the key; only 5xx responses release it
+        ShoppingCartModel.objects.get(user=self.user).clear()
+        self.assertEqual(self.place_order(key="order-1").status_code, 400)
+
+        self.add_to_cart(self.lamp, 1)
+        retry = self.place_order(key="order-1")
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertTrue(IdempotencyKeyModel.objects.filter(user=self.user, key="order-1", response_status=400).exists())
+
+class OrderTotalsTests(CheckoutTestCase):
+    def test_place_order_stores_totals_from_the_cart(self):
+        response = self.place_order()
+        self.assertEqual(response.status_code, 201)
+
+        order = OrderModel.objects.get(pk=response.data["order_id"])
+        items_total = sum(item.price * item.quantity for item in order.items.all())
+        self.assertEqual((order.subtotal, order.total), (Decimal("38.00"), Decimal("38.00")))
+        self.assertEqual(order.total, items_total)
+        self.assertEqual(order.invoice.amount_due, order.total)
+
+        cart = ShoppingCartModel.objects.get(user=self.user)
+        self.assertEqual((cart.total, cart.item_count), (0, 0))
+
+    def test_later_price_changes_do_not_move_order_totals(self):
+        order_id = self.place_order().data["order_id"]
+        ProductModel.objects.filter(pk=self.lamp.pk).update(price="99.00")
+
+        response = self.client.get(f"/api/order/{order_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(str(response.data["total"])), Decimal("38.00"))
+
+    def test_migration_backfills_totals_from_order_items(self):
+        order_id = self.place_order().data["order_id"]
+        OrderModel.objects.filter(pk=order_id).update(subtotal=0, total=0)
+
+        migration = importlib.import_module("base.migrations.0016_ordermodel_subtotal_ordermodel_total")
+        migration.backfill_order_totals(apps, None)
+
+        order = OrderModel.objects.get(pk=order_id)
+        self.assertEqual((order.subtotal, order.total), (Decimal("38.00"), Decimal("38.00")))
+
+class StockReservationTests(CheckoutTestCase):
+    def stock(self, product):
+        return ProductModel.objects.values_list("stock", flat=True).get(pk=product.pk)
+
+    def test_place_order_holds_stock_until_paid(self):
+        invoice_id = self.place_order().data["invoice"]["id"]
+        self.assertEqual((self.stock(self.lamp), self.stock(self.cable)), (3, 6))
+
+        holds = dict(StockReservationModel.objects.filter(invoice_id=invoice_id).values_list("product_id", "quantity"))
+        self.assertEqual(holds, {self.lamp.id: 2, self.cable.id: 4})
+        levels = InventoryManager().stock_levels().get(pk=self.lamp.pk)
+        self.assertEqual((levels.stock, levels.reserved, levels.on_hand), (3, 2, 5))
+
+        self.assertEqual(self.pay_invoice(invoice_id).status_code, 200)
+        statuses = set(StockReservationModel.objects.filter(invoice_id=invoice_id).values_list("status", flat=True))
+        self.assertEqual(statuses, {RESERVATION_STATUS.CONSUMED.value})
+
+        # Consumed holds are never returned to stock
+        InventoryManager().release_expired_reservations(now=timezone.now() + timedelta(days=30))
+        self.assertEqual(self.stock(self.lamp), 3)
+
+    def test_expired_holds_return_stock_and_cancel_the_invoice(self):
+        response = self.place_order()
+        invoice_id = response.data["invoice"]["id"]
+
+        result = InventoryManager().release_expired_reservations(now=timezone.now() + timedelta(days=30))
+        self.assertEqual(result, {"released": 2, "cancelled_invoices": 1})
+        self.assertEqual((self.stock(self.lamp), self.stock(self.cable)), (5, 10))
+        self.assertEqual(InvoiceModel.objects.get(pk=invoice_id).status, INVOICE_STATUS.CANCELLED.value)
+        self.assertEqual(OrderModel.objects.get(pk=response.data["order_id"]).status, "cancelled")
+        self.assertEqual(self.pay_invoice(invoice_id).status_code, 400)
+
+    def test_batches_release_whole_invoices(self):
+        first = self.place_order().data["invoice"]["id"]
+        self.add_to_cart(self.lamp, 1)
+        second = self.place_order().data["invoice"]["id"]
+
+        # One invoice per transaction; each releases all of its holds
+        result = InventoryManager().release_expired_reservations(now=timezone.now() + timedelta(days=30), batch_size=1)
+        self.assertEqual(result, {"released": 3, "cancelled_invoices": 2})
+        self.assertEqual((self.stock(self.lamp), self.stock(self.cable)), (5, 10))
+        statuses = set(InvoiceModel.objects.filter(pk__in=[first, second]).values_list("status", flat=True))
+        self.assertEqual(statuses, {INVOICE_STATUS.CANCELLED.value})
+
+    def test_short_line_reserves_nothing(self):
+        ProductModel.objects.filter(pk=self.cable.pk).update(stock=3)
+
+        self.assertEqual(self.place_order().status_code, 400)
+        self.assertEqual((self.stock(self.lamp), self.stock(self.cable)), (5, 3))
+        self.assertFalse(StockReservationModel.objects.exists())
@@ -0,0 +1,86 @@
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from base.models import RevokedTokenModel, UserModel
+
+ACCESS_TOKEN_SALT = "api.tokens.access"
+REFRESH_TOKEN_SALT = "api.tokens.refresh"
+
+def _lifetime(name):
+    return int(getattr(settings, name).total_seconds())
+
+def _issue(user, salt):
+    claims = {
+        "uid": str(user.id),
+        "role": user.role,
+        "jti": uuid.uuid4().hex,
+        "iat": time.time(),
+    }
+    return signing.dumps(claims, salt=salt)
+
+def issue_tokens(user):
+    """Issue a signed access/refresh token pair carrying the user's id and role"""
+    return {
+        "access": _issue(user, ACCESS_TOKEN_SALT),
+        "refresh": _issue(user, REFRESH_TOKEN_SALT),
+        "token_type": "Bearer",
+        "expires_in": _lifetime("ACCESS_TOKEN_LIFETIME"),
+    }
+
+def _verify(token, salt, max_age):
+    """
+    Check the token signature and age with HMAC, then load the user with one query
+    that also checks revocation: the user must still exist, the token must not be
+    revoked and it must be issued after the user's tokens_valid_after.
+    Returns (claims, user), or None if the token is not valid.
+    """
+    try:
+        claims = signing.loads(token, salt=salt, max_age=max_age)
+    except signing.BadSignature:
+        return None
+
+    user = UserModel.objects.filter(pk=claims["uid"]).annotate(
+        revoked=Exists(RevokedTokenModel.objects.filter(jti=claims["jti"], user=OuterRef("pk")))
+    ).first()
+    if user is None or user.revoked:
+        return None
+
+    valid_after = user.tokens_valid_after
+    if valid_after is not None and claims["iat"] < valid_after.timestamp():
+        return None
+
+    return claims, user
+
+def verify_access_token(token):
+    return _verify(token, ACCESS_TOKEN_SALT, _lifetime("ACCESS_TOKEN_LIFETIME"))
+
+def verify_refresh_token(token):
+    return _verify(token, REFRESH_TOKEN_SALT, _lifetime("REFRESH_TOKEN_LIFETIME"))
+
+def revoke_token(claims):
+    """
+    Revoke a single token until it would have expired anyway. Returns False if it
+    was already revoked, so a refresh token raced by two requests is used only once.
+    """
+    issued_at = datetime.fromtimestamp(claims["iat"], tz=dt_timezone.utc)
+    try:
+        with transaction.atomic():
+            RevokedTokenModel.objects.create(
+                user_id=claims["uid"],
+                jti=claims["jti"],
+                expires_at=issued_at + getattr(settings, "REFRESH_TOKEN_LIFETIME"),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+def revoke_user_tokens(user_id):
+    """Forced logout: revoke every token issued to the user up to now"""
+    UserModel.objects.filter(pk=user_id).update(tokens_valid_after=timezone.now())
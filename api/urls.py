@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .controllers import *
 
@@ -10,4 +11,6 @@ router.register(r"category", CategoryViewSet, "category")
 router.register(r"shipment", ShipmentViewSet, "shipment")
 router.register(r"shopping-cart", ShoppingCartViewSet, "shopping-cart")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("events/", event_stream, name="events"),
+]
@@ -3,3 +3,5 @@ from .shipment_status import SHIPMENT_STATUS
 from .invoice_status import INVOICE_STATUS
 from .order_payment_status import ORDER_PAYMENT_STATUS
 from .payment_status import PAYMENT_STATUS
+from .reservation_status import RESERVATION_STATUS
+from .wallet_transaction_type import WALLET_TRANSACTION_TYPE
@@ -0,0 +1,6 @@
+from enum import Enum
+
+class RESERVATION_STATUS(Enum):
+    ACTIVE = "active"
+    CONSUMED = "consumed"
+    RELEASED = "released"
@@ -0,0 +1,7 @@
+from enum import Enum
+
+class WALLET_TRANSACTION_TYPE(Enum):
+    OPENING = "opening"
+    TOP_UP = "top_up"
+    WITHDRAWAL = "withdrawal"
+    PAYMENT = "payment"
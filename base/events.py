@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+class StreamLimitExceeded(Exception):
+    """Raised when a worker already serves EVENT_STREAM_MAX_CONNECTIONS streams"""
+
+class Subscription:
+    """
+    One connected event stream. Events are handed over from publishing threads to
+    the subscriber's event loop. A subscriber that falls more than its queue size
+    behind is marked overflowed: it should deliver what is queued, then reconnect
+    with Last-Event-ID.
+    """
+    def __init__(self, broker, loop, max_pending):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's event loop is gone
+            self.close()
+
+    def _put(self, event):
+        # After an overflow nothing more is queued, so the delivered events stay gap-free
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    @property
+    def exhausted(self):
+        """Overflowed and every queued event delivered"""
+        return self.overflowed and self.queue.empty()
+
+    async def get(self, timeout):
+        """Next event, or None when nothing arrived within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class InProcessBroker:
+    """
+    Event broker for a single process. Published events get increasing ids and are
+    kept in a ring buffer of EVENT_STREAM_BUFFER_SIZE events so a reconnecting client
+    can resume after its Last-Event-ID. Every process has its own broker and events
+    never cross processes: a stream only sees changes made by the process serving
+    it. Run the API as a single ASGI process, or set EVENT_STREAM_BACKEND to a
+    broker with the same publish/subscribe/unsubscribe interface on a shared bus.
+    """
+    def __init__(self):
+        self.buffer_size = getattr(settings, "EVENT_STREAM_BUFFER_SIZE", 1000)
+        self.max_connections = getattr(settings, "EVENT_STREAM_MAX_CONNECTIONS", 500)
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=self.buffer_size)
+        self._subscribers = set()
+        self._next_id = 1
+
+    def publish(self, event_type, data, user_id=None):
+        """Send an event to every subscriber; `user_id` is the customer it concerns"""
+        with self._lock:
+            event = {
+                "id": self._next_id,
+                "type": event_type,
+                "data": data,
+                "user_id": str(user_id) if user_id is not None else None,
+                "timestamp": time.time(),
+            }
+            self._next_id += 1
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            subscription.push(event)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """
+        Open a subscription on the running event loop. With `last_event_id`, the
+        buffered events after it are delivered first.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if len(self._subscribers) >= self.max_connections:
+                raise StreamLimitExceeded()
+
+            backlog = []
+            if last_event_id is not None:
+                backlog = [event for event in self._buffer if event["id"] > last_event_id]
+
+            subscription = Subscription(self, loop, self.buffer_size)
+            self._subscribers.add(subscription)
+
+        for event in backlog:
+            subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """The process-wide broker built from the EVENT_STREAM_BACKEND setting"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, "EVENT_STREAM_BACKEND", "base.events.InProcessBroker")
+                _broker = import_string(backend)()
+    return _broker
+
+def publish_event(event_type, data, user_id=None):
+    """Publish an event once the current transaction commits, so rolled back changes are never announced"""
+    transaction.on_commit(lambda: get_broker().publish(event_type, data, user_id))
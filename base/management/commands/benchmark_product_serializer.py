@@ -0,0 +1,78 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.models import CategoryModel, ProductModel
+
+class Command(BaseCommand):
+    help = "Compare ProductModelSerializer with the ProductReadSerializer fast path on in-memory rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated row counts")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per size; the best time is reported")
+
+    def handle(self, *args, **options):
+        # Imported here so the base app does not depend on the api package at load time
+        from api.serializers import ProductModelSerializer, ProductReadSerializer
+
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers")
+
+        categories = [CategoryModel(id=f"category{i}", name=f"Category {i}", description="") for i in range(10)]
+
+        self.stdout.write(f"{'rows':>8} {'ModelSerializer':>16} {'ReadSerializer':>15} {'speedup':>8}")
+        for size in sizes:
+            products, rows = self._build(size, categories)
+
+            model_time = self._best_of(options["repeat"], lambda: ProductModelSerializer(products, many=True).data)
+            read_time = self._best_of(options["repeat"], lambda: ProductReadSerializer(rows, many=True).data)
+
+            # Both paths must render identical payloads
+            sample = slice(0, 50)
+            expected = [dict(item) for item in ProductModelSerializer(products[sample], many=True).data]
+            if expected != ProductReadSerializer(rows[sample], many=True).data:
+                raise CommandError("ProductReadSerializer output differs from ProductModelSerializer")
+
+            self.stdout.write(
+                f"{size:>8} {model_time * 1000:>14.1f}ms {read_time * 1000:>13.1f}ms {model_time / read_time:>7.1f}x"
+            )
+
+    def _build(self, size, categories):
+        products = []
+        rows = []
+        for i in range(size):
+            # Every tenth product has no category, exercising the omitted "category" key
+            category = categories[i % len(categories)] if i % 10 else None
+            product = ProductModel(
+                id=uuid.uuid4(),
+                name=f"Product {i}",
+                description=f"Description for product {i}",
+                price=Decimal(i % 500) + Decimal("0.99"),
+                stock=i % 50,
+                is_active=True,
+                category=category,
+            )
+            products.append(product)
+            rows.append({
+                "id": product.id,
+                "name": product.name,
+                "description": product.description,
+                "price": product.price,
+                "stock": product.stock,
+                "category__name": category.name if category else None,
+                "is_active": product.is_active,
+            })
+        return products, rows
+
+    def _best_of(self, repeat, render):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.models import IdempotencyKeyModel
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses that have expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per statement")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            batch = list(
+                IdempotencyKeyModel.objects.filter(expires_at__lte=now).values_list("pk", flat=True)[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            deleted += IdempotencyKeyModel.objects.filter(pk__in=batch).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency key(s)"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.models import RevokedTokenModel
+
+class Command(BaseCommand):
+    help = "Delete revoked token records whose tokens have expired anyway"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per statement")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            batch = list(
+                RevokedTokenModel.objects.filter(expires_at__lte=now).values_list("pk", flat=True)[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            deleted += RevokedTokenModel.objects.filter(pk__in=batch).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired revoked token(s)"))
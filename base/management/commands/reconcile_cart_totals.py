@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.managers import CartManager
+
+class Command(BaseCommand):
+    help = "Recompute stored shopping cart totals from their items and repair any that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted carts without repairing them")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = CartManager().reconcile()
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{repaired} cart(s) have drifted totals")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired totals of {repaired} cart(s)"))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.managers import InventoryManager
+
+class Command(BaseCommand):
+    help = "Return stock held for unpaid invoices past their due date and cancel those invoices"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Invoices released per transaction")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and sweep every INTERVAL seconds instead of exiting after one sweep"
+        )
+
+    def handle(self, *args, **options):
+        manager = InventoryManager()
+        while True:
+            result = manager.release_expired_reservations(batch_size=options["batch_size"])
+            self.stdout.write(
+                f"Released {result['released']} reservation(s), cancelled {result['cancelled_invoices']} invoice(s)"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
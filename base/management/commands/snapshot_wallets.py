@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from base.managers import WalletManager
+
+class Command(BaseCommand):
+    help = "Snapshot wallet balances that changed since their last snapshot and check them against the ledger"
+
+    def handle(self, *args, **options):
+        result = WalletManager().take_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"Took {result['snapshots']} wallet snapshot(s)"))
+
+        for user_id in result["mismatched"]:
+            self.stderr.write(f"Wallet ledger of user {user_id} does not add up to its recorded balance")
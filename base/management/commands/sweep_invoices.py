@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.managers import InventoryManager, InvoiceManager
+
+class Command(BaseCommand):
+    help = "Mark pending invoices past their due date as overdue and optionally cancel expired ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Invoices updated per statement")
+        parser.add_argument(
+            "--cancel-expired",
+            action="store_true",
+            help="Also cancel unpaid invoices whose stock reservation has expired and return the stock"
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        marked = InvoiceManager().mark_overdue(chunk_size=options["chunk_size"])
+        self.stdout.write(f"Marked {marked} invoice(s) overdue in {time.monotonic() - start:.2f}s")
+
+        if options["cancel_expired"]:
+            start = time.monotonic()
+            result = InventoryManager().release_expired_reservations(batch_size=options["chunk_size"])
+            self.stdout.write(
+                f"Cancelled {result['cancelled_invoices']} invoice(s) and released {result['released']} "
+                f"reservation(s) in {time.monotonic() - start:.2f}s"
+            )
@@ -1,13 +1,383 @@
+import csv
+import json
+import threading
 import uuid
 from datetime import timedelta, datetime
+from decimal import Decimal, InvalidOperation
 
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import IntegrityError, connection, transaction
 from django.utils import timezone
-from django.db.models import Sum, Count, F, ExpressionWrapper, DecimalField
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth, TruncYear
+from django.db.models import Sum, Count, Max, Avg, F, Q, Case, When, Value, ExpressionWrapper, DecimalField, DurationField, FloatField, BooleanField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek, TruncMonth, TruncYear
 from django.db.models.expressions import OuterRef, Subquery
 
-from base.models import ProductModel, ShipmentModel, OrderModel, OrderItemModel
-from base.enums import SHIPMENT_STATUS
+from base.models import CatalogVersionModel, ProductModel, ShipmentModel, OrderModel, OrderItemModel, CategoryModel, ShoppingCartModel, CartItemModel, InvoiceModel, StockReservationModel, UserModel, WalletTransactionModel, WalletSnapshotModel
+from base.enums import SHIPMENT_STATUS, INVOICE_STATUS, RESERVATION_STATUS, WALLET_TRANSACTION_TYPE
+from base.events import publish_event
+
+class CartManager:
+    """
+    Cart item writes that keep ShoppingCartModel.total and item_count in step.
+    Every item insert, update or delete adjusts the cart's totals by the same
+    delta in the same transaction. reconcile() recomputes totals from the items
+    to repair drift, e.g. after product price changes.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CartManager, cls).__new__(cls)
+        return cls._instance
+
+    def add_item(self, cart, product, quantity):
+        """
+        Add `quantity` of `product`, creating the line or growing an existing one.
+        The line is written with a single atomic upsert so concurrent adds of the
+        same product never lose an update.
+        """
+        with transaction.atomic():
+            self._upsert_item(cart, product, quantity)
+            self._adjust_totals(cart, product.price * quantity, quantity)
+
+    def _upsert_item(self, cart, product, quantity):
+        if connection.features.supports_update_conflicts_with_target:
+            table = connection.ops.quote_name(CartItemModel._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} ("cart_id", "product_id", "quantity") VALUES (%s, %s, %s) '
+                    f'ON CONFLICT ("cart_id", "product_id") DO UPDATE SET "quantity" = {table}."quantity" + EXCLUDED."quantity"',
+                    [cart.pk, CartItemModel._meta.get_field("product").get_db_prep_value(product.pk, connection), quantity],
+                )
+            return
+
+        # Databases without ON CONFLICT: grow the line in place, insert it when missing,
+        # and fall back to the update if a concurrent add inserted it first
+        line = CartItemModel.objects.filter(cart=cart, product=product)
+        if line.update(quantity=F("quantity") + quantity):
+            return
+        try:
+            with transaction.atomic():
+                CartItemModel.objects.create(cart=cart, product=product, quantity=quantity)
+        except IntegrityError:
+            line.update(quantity=F("quantity") + quantity)
+
+    def set_item_quantity(self, cart, cart_item, quantity):
+        """Set a line's quantity; a quantity of 0 or less removes the line"""
+        if quantity <= 0:
+            return self.remove_item(cart, cart_item)
+
+        with transaction.atomic():
+            # Take the delta from the locked row, not from a copy a concurrent add may have outdated
+            current = self._lock_quantity(cart_item)
+            if current is None:
+                return
+            CartItemModel.objects.filter(pk=cart_item.pk).update(quantity=quantity)
+            delta = quantity - current
+            self._adjust_totals(cart, cart_item.product.price * delta, delta)
+            cart_item.quantity = quantity
+
+    def remove_item(self, cart, cart_item):
+        with transaction.atomic():
+            current = self._lock_quantity(cart_item)
+            if current is None:
+                return
+            CartItemModel.objects.filter(pk=cart_item.pk).delete()
+            self._adjust_totals(cart, -cart_item.product.price * current, -current)
+            cart_item.quantity = current
+
+    def _lock_quantity(self, cart_item):
+        """Re-read a line's quantity under a row lock; None if the line is already gone"""
+        return CartItemModel.objects.select_for_update().filter(pk=cart_item.pk).values_list("quantity", flat=True).first()
+
+    def apply_operations(self, cart, operations, products):
+        """
+        Apply an ordered list of {"op": "add"|"set"|"remove", "product_id", "quantity"?}
+        operations in one transaction. `products` maps every referenced product id to
+        its ProductModel. The final quantities are worked out in memory first, then
+        written with one bulk insert, one bulk update and one delete, and the cart
+        totals are rewritten from the result.
+        """
+        with transaction.atomic():
+            # Serialize concurrent batches on the same cart
+            ShoppingCartModel.objects.select_for_update().filter(pk=cart.pk).first()
+
+            existing = {item.product_id: item for item in cart.items.select_related("product")}
+            quantities = {product_id: item.quantity for product_id, item in existing.items()}
+
+            for operation in operations:
+                product_id = operation["product_id"]
+                if operation["op"] == "add":
+                    quantities[product_id] = quantities.get(product_id, 0) + operation["quantity"]
+                elif operation["op"] == "set" and operation["quantity"] > 0:
+                    quantities[product_id] = operation["quantity"]
+                else:
+                    # remove, or set to 0
+                    quantities.pop(product_id, None)
+
+            to_create = []
+            to_update = []
+            for product_id, quantity in quantities.items():
+                item = existing.get(product_id)
+                if item is None:
+                    to_create.append(CartItemModel(cart=cart, product=products[product_id], quantity=quantity))
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    to_update.append(item)
+            to_delete = [item.pk for product_id, item in existing.items() if product_id not in quantities]
+
+            if to_create:
+                CartItemModel.objects.bulk_create(to_create)
+            if to_update:
+                CartItemModel.objects.bulk_update(to_update, ["quantity"])
+            if to_delete:
+                CartItemModel.objects.filter(pk__in=to_delete).delete()
+
+            prices = {product_id: item.product.price for product_id, item in existing.items()}
+            prices.update((product_id, product.price) for product_id, product in products.items())
+            cart.total = sum((prices[product_id] * quantity for product_id, quantity in quantities.items()), Decimal("0"))
+            cart.item_count = sum(quantities.values())
+            ShoppingCartModel.objects.filter(pk=cart.pk).update(total=cart.total, item_count=cart.item_count)
+
+        return {"created": len(to_create), "updated": len(to_update), "removed": len(to_delete)}
+
+    def _adjust_totals(self, cart, total_delta, count_delta):
+        ShoppingCartModel.objects.filter(pk=cart.pk).update(
+            total=F("total") + total_delta,
+            item_count=F("item_count") + count_delta,
+        )
+        cart.total += total_delta
+        cart.item_count += count_delta
+
+    def reconcile(self, queryset=None):
+        """
+        Recompute totals from the cart items for every cart in `queryset` (all carts by
+        default) whose stored totals drifted. Returns the number of carts repaired.
+        """
+        if queryset is None:
+            queryset = ShoppingCartModel.objects.all()
+
+        item_totals = CartItemModel.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+        computed_total = Coalesce(
+            Subquery(item_totals.annotate(
+                value=Sum(F("quantity") * F("product__price"), output_field=DecimalField(max_digits=12, decimal_places=2))
+            ).values("value")),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        computed_count = Coalesce(
+            Subquery(item_totals.annotate(value=Sum("quantity")).values("value")),
+            Value(0),
+        )
+
+        drifted = queryset.annotate(
+            computed_total=computed_total,
+            computed_count=computed_count,
+        ).filter(
+            ~Q(total=F("computed_total")) | ~Q(item_count=F("computed_count"))
+        ).values("pk")
+
+        return ShoppingCartModel.objects.filter(pk__in=drifted).update(
+            total=computed_total,
+            item_count=computed_count,
+        )
+
+    def refresh_totals_for_products(self, product_ids):
+        """Reprice the carts that contain any of `product_ids`"""
+        return self.reconcile(ShoppingCartModel.objects.filter(
+            pk__in=CartItemModel.objects.filter(product_id__in=product_ids).values("cart")
+        ))
+
+class WalletManager:
+    """
+    Wallet changes go through here. Each change appends a WalletTransactionModel row
+    and moves UserModel.wallet by the same amount in one transaction, so the column
+    is always the sum of the ledger. Snapshots let the ledger balance be checked
+    from the latest snapshot plus the few transactions after it.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(WalletManager, cls).__new__(cls)
+        return cls._instance
+
+    def adjust(self, user, amount, kind, reference=""):
+        """
+        Move the wallet by `amount` (negative to debit). The balance is changed with
+        a conditional UPDATE that never lets it go below zero. Returns the ledger
+        row, or None when the balance is insufficient.
+        """
+        with transaction.atomic():
+            updated = UserModel.objects.filter(pk=user.pk, wallet__gte=-amount).update(wallet=F("wallet") + amount)
+            if not updated:
+                return None
+
+            # The row is locked by the update above, so this is our own new balance
+            balance = UserModel.objects.filter(pk=user.pk).values_list("wallet", flat=True).get()
+            wallet_transaction = WalletTransactionModel.objects.create(
+                user=user,
+                amount=amount,
+                balance_after=balance,
+                kind=kind.value,
+                reference=reference,
+            )
+
+        user.wallet = balance
+        return wallet_transaction
+
+    def set_balance(self, user, balance, reference=""):
+        """Record a top-up or withdrawal that brings the wallet to `balance`"""
+        with transaction.atomic():
+            current = UserModel.objects.select_for_update().filter(pk=user.pk).values_list("wallet", flat=True).get()
+            amount = balance - current
+            if not amount:
+                user.wallet = current
+                return None
+
+            kind = WALLET_TRANSACTION_TYPE.TOP_UP if amount > 0 else WALLET_TRANSACTION_TYPE.WITHDRAWAL
+            return self.adjust(user, amount, kind, reference)
+
+    def take_snapshots(self):
+        """
+        Snapshot every wallet with transactions since its latest snapshot, using one
+        grouped query over the new transactions. Returns the number of snapshots and
+        the ids of users whose snapshot disagrees with their recorded balance.
+        """
+        latest_snapshot = WalletSnapshotModel.objects.filter(
+            user=OuterRef("user")
+        ).order_by("-last_transaction_id").values("last_transaction_id")[:1]
+
+        deltas = list(
+            WalletTransactionModel.objects.filter(
+                id__gt=Coalesce(Subquery(latest_snapshot), Value(0))
+            ).order_by().values("user").annotate(delta=Sum("amount"), last_id=Max("id"))
+        )
+        if not deltas:
+            return {"snapshots": 0, "mismatched": []}
+
+        user_ids = [row["user"] for row in deltas]
+        # Only each user's latest snapshot, not their whole snapshot history
+        previous = dict(
+            WalletSnapshotModel.objects.filter(
+                user__in=user_ids,
+                last_transaction_id=Subquery(latest_snapshot)
+            ).values_list("user", "balance")
+        )
+        recorded = dict(
+            WalletTransactionModel.objects.filter(id__in=[row["last_id"] for row in deltas]).values_list("id", "balance_after")
+        )
+
+        snapshots = []
+        mismatched = []
+        for row in deltas:
+            balance = previous.get(row["user"], Decimal("0")) + row["delta"]
+            snapshots.append(WalletSnapshotModel(user_id=row["user"], balance=balance, last_transaction_id=row["last_id"]))
+            if balance != recorded[row["last_id"]]:
+                mismatched.append(str(row["user"]))
+
+        WalletSnapshotModel.objects.bulk_create(snapshots)
+        return {"snapshots": len(snapshots), "mismatched": mismatched}
+
+class CatalogCache:
+    """
+    Versioned cache for catalog (product and category) responses.
+    Every product or category write bumps a global version after commit; cached
+    entries are stored under the version current when they were built, so a bump
+    makes all of them unreachable at once. The version is a CatalogVersionModel
+    row, so a bump reaches every process; entries themselves stay in the local
+    cache and also expire after CATALOG_CACHE_TTL seconds.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CatalogCache, cls).__new__(cls)
+        return cls._instance
+
+    def version(self):
+        version = CatalogVersionModel.objects.filter(pk=1).values_list("version", flat=True).first()
+        if version is None:
+            version = CatalogVersionModel.objects.get_or_create(pk=1)[0].version
+        return version
+
+    def bump(self):
+        """Invalidate every cached catalog response once the current transaction commits"""
+        transaction.on_commit(self._increment)
+
+    def _increment(self):
+        if not CatalogVersionModel.objects.filter(pk=1).update(version=F("version") + 1):
+            CatalogVersionModel.objects.get_or_create(pk=1, defaults={"version": 2})
+
+    def get(self, version, key):
+        return cache.get(f"catalog:{version}:{key}")
+
+    def set(self, version, key, value):
+        cache.set(f"catalog:{version}:{key}", value, getattr(settings, "CATALOG_CACHE_TTL", 300))
+
+class CategoryRegistry:
+    """
+    In-process registry of all categories, keyed by id and by name.
+    The snapshot is tagged with the catalog version it was loaded under and reloaded
+    with a single query once CatalogCache's version moves on, so category writes in
+    any process are picked up by the next lookup. Callers that already read the
+    version can pass it in to skip the version lookup.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CategoryRegistry, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._generation = 0
+            cls._instance._snapshot = None
+        return cls._instance
+
+    def _load(self, version=None):
+        if version is None:
+            version = CatalogCache().version()
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot["version"] == version:
+            return snapshot
+
+        generation = self._generation
+        categories = list(CategoryModel.objects.order_by("name"))
+        snapshot = {
+            "categories": categories,
+            "by_id": {category.id: category for category in categories},
+            "by_name": {category.name: category for category in categories},
+            "version": version,
+        }
+
+        # Don't publish a snapshot that was read while a write invalidated the registry
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def all(self, version=None):
+        """All categories ordered by name"""
+        return list(self._load(version)["categories"])
+
+    def get(self, id_or_name, version=None):
+        """Look a category up by id, then by name. Returns None if neither matches."""
+        snapshot = self._load(version)
+        return snapshot["by_id"].get(id_or_name) or snapshot["by_name"].get(id_or_name)
+
+    def existing_ids(self, category_ids, version=None):
+        """Filter a list of category ids down to the ones that exist"""
+        by_id = self._load(version)["by_id"]
+        return [category_id for category_id in category_ids if category_id in by_id]
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
 
 class InventoryManager:
     _instance = None
@@ -38,9 +408,570 @@ class InventoryManager:
     def all_inventory(self):
         return [(p, getattr(p, "stock", None)) for p in ProductModel.objects.all()] 
 
+    def reserve_stock(self, quantities):
+        """
+        Take stock for several products at once. `quantities` maps product id to the
+        quantity wanted. Stock is decremented by one conditional CASE UPDATE that only
+        touches rows with enough stock, so concurrent reservations cannot oversell.
+        Either every product is reserved or none is. Returns a list of
+        (product_id, available, requested) for the products that fell short.
+        """
+        if not quantities:
+            return []
+
+        with transaction.atomic():
+            stock_field = ProductModel._meta.get_field("stock")
+            enough_stock = Q()
+            new_stock = []
+            for product_id, quantity in quantities.items():
+                enough_stock |= Q(pk=product_id, stock__gte=quantity)
+                new_stock.append(When(pk=product_id, then=F("stock") - quantity))
+
+            updated = ProductModel.objects.filter(enough_stock).update(
+                stock=Case(*new_stock, default=F("stock"), output_field=stock_field)
+            )
+            if updated != len(quantities):
+                # Undo the rows that were reserved and report what is missing
+                transaction.set_rollback(True)
+
+        if updated != len(quantities):
+            available = dict(ProductModel.objects.filter(pk__in=quantities.keys()).values_list("pk", "stock"))
+            return [
+                (product_id, available.get(product_id), quantity)
+                for product_id, quantity in quantities.items()
+                if available.get(product_id) is None or available[product_id] < quantity
+            ]
+
+        CatalogCache().bump()
+        return []
+
+    def hold_stock(self, invoice, quantities):
+        """
+        Record the stock taken by reserve_stock() as held for `invoice` until its due
+        date plus STOCK_RESERVATION_GRACE_PERIOD.
+        """
+        expires_at = invoice.due_date + getattr(settings, "STOCK_RESERVATION_GRACE_PERIOD", timedelta(0))
+        return StockReservationModel.objects.bulk_create([
+            StockReservationModel(invoice=invoice, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ])
+
+    def consume_reservations(self, invoice):
+        """Mark the holds of a paid invoice as consumed so they are never released"""
+        return StockReservationModel.objects.filter(
+            invoice=invoice,
+            status=RESERVATION_STATUS.ACTIVE.value
+        ).update(status=RESERVATION_STATUS.CONSUMED.value)
+
+    def release_expired_reservations(self, now=None, batch_size=500):
+        """
+        Return expired holds of unpaid invoices to stock and cancel those invoices,
+        `batch_size` invoices per transaction. Returns the number of released holds and
+        cancelled invoices.
+        """
+        now = now or timezone.now()
+        expired = StockReservationModel.objects.filter(status=RESERVATION_STATUS.ACTIVE.value, expires_at__lte=now)
+
+        result = {"released": 0, "cancelled_invoices": 0}
+        while True:
+            batch = self.release_reservations(expired, batch_size)
+            result["released"] += batch["released"]
+            result["cancelled_invoices"] += batch["cancelled_invoices"]
+            if not batch["released"]:
+                return result
+
+    def release_reservations(self, reservations, limit=None):
+        """
+        Release up to `limit` unpaid invoices holding active holds from `reservations`
+        in one transaction: every active hold of those invoices is added back to stock
+        with one CASE UPDATE and marked released, and the invoices and orders are
+        cancelled. Holds of paid invoices are left alone.
+        """
+        unpaid = [INVOICE_STATUS.PENDING.value, INVOICE_STATUS.OVERDUE.value]
+
+        with transaction.atomic():
+            # Claim the invoices before their holds, in the same order as a payment, so
+            # the two never wait on each other's locks
+            invoices = InvoiceModel.objects.filter(
+                status__in=unpaid,
+                pk__in=reservations.filter(status=RESERVATION_STATUS.ACTIVE.value).values("invoice_id")
+            ).order_by("id")
+            if connection.features.has_select_for_update_skip_locked:
+                # Concurrent sweepers take disjoint batches, and invoices being paid are skipped
+                invoices = invoices.select_for_update(skip_locked=True)
+            if limit:
+                invoices = invoices[:limit]
+            invoice_ids = list(invoices.values_list("id", flat=True))
+
+            if not invoice_ids:
+                return {"released": 0, "cancelled_invoices": 0}
+
+            # An invoice is cancelled as a whole, so release all of its holds together
+            rows = list(StockReservationModel.objects.select_for_update().filter(
+                invoice__in=invoice_ids,
+                status=RESERVATION_STATUS.ACTIVE.value
+            ).values_list("id", "product_id", "quantity"))
+
+            quantities = {}
+            for _, product_id, quantity in rows:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+            stock_field = ProductModel._meta.get_field("stock")
+            ProductModel.objects.filter(pk__in=quantities.keys()).update(stock=Case(
+                *[When(pk=product_id, then=F("stock") + quantity) for product_id, quantity in quantities.items()],
+                default=F("stock"),
+                output_field=stock_field,
+            ))
+
+            StockReservationModel.objects.filter(pk__in=[row[0] for row in rows]).update(
+                status=RESERVATION_STATUS.RELEASED.value
+            )
+
+            cancelled = InvoiceModel.objects.filter(pk__in=invoice_ids, status__in=unpaid).update(
+                status=INVOICE_STATUS.CANCELLED.value,
+                updated_at=timezone.now()
+            )
+            OrderModel.objects.filter(invoice__in=invoice_ids).update(status="cancelled")
+
+            CatalogCache().bump()
+
+        print(f"Released {len(rows)} stock reservation(s) and cancelled {cancelled} invoice(s)")
+        return {"released": len(rows), "cancelled_invoices": cancelled}
+
+    def stock_levels(self, queryset=None):
+        """
+        Products annotated with `reserved` (stock held for unpaid invoices) and
+        `on_hand` (stock plus reserved). `stock` itself is the available-to-sell amount.
+        """
+        if queryset is None:
+            queryset = ProductModel.objects.all()
+
+        reserved = StockReservationModel.objects.filter(
+            product=OuterRef("pk"),
+            status=RESERVATION_STATUS.ACTIVE.value
+        ).order_by().values("product").annotate(total=Sum("quantity")).values("total")
+
+        return queryset.annotate(
+            reserved=Coalesce(Subquery(reserved), Value(0)),
+        ).annotate(on_hand=F("stock") + F("reserved"))
+
+
+class InvoiceManager:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(InvoiceManager, cls).__new__(cls)
+        return cls._instance
+
+    def mark_overdue(self, now=None, chunk_size=1000):
+        """
+        Move pending invoices past their due date to OVERDUE, `chunk_size` rows per
+        UPDATE so no statement holds row locks for long. Returns the number of
+        invoices marked.
+        """
+        now = now or timezone.now()
+        overdue = InvoiceModel.objects.filter(status=INVOICE_STATUS.PENDING.value, due_date__lt=now)
+
+        marked = 0
+        while True:
+            chunk = list(overdue.order_by("due_date", "id").values_list("id", flat=True)[:chunk_size])
+            if not chunk:
+                return marked
+
+            # Re-check the status so an invoice paid in the meantime is left alone
+            marked += InvoiceModel.objects.filter(pk__in=chunk, status=INVOICE_STATUS.PENDING.value).update(
+                status=INVOICE_STATUS.OVERDUE.value,
+                updated_at=now
+            )
+
+class ProductImportManager:
+    """
+    Chunked upsert of products from CSV or NDJSON text lines.
+    Rows are parsed and validated one at a time, categories resolve through the
+    CategoryRegistry, and each chunk is written with a single bulk upsert in its
+    own transaction, so memory use is bounded by the chunk size, not the file size.
+    """
+    _instance = None
+    UPDATE_FIELDS = ["name", "description", "price", "stock", "category", "is_active"]
+    MAX_REPORTED_ERRORS = 1000
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ProductImportManager, cls).__new__(cls)
+        return cls._instance
+
+    def import_csv(self, lines, chunk_size=None):
+        """Import from CSV lines with a header row naming the product fields"""
+        reader = csv.DictReader(lines)
+
+        def rows():
+            for row in reader:
+                yield reader.line_num, row
+
+        return self._import(rows(), chunk_size)
+
+    def import_ndjson(self, lines, chunk_size=None):
+        """Import from newline-delimited JSON, one product object per line"""
+        def rows():
+            for line_number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, None
+
+        return self._import(rows(), chunk_size)
+
+    def _import(self, rows, chunk_size):
+        chunk_size = chunk_size or getattr(settings, "PRODUCT_IMPORT_CHUNK_SIZE", 1000)
+        report = {"imported": 0, "failed": 0, "errors": []}
+        chunk = {}
+        # Resolve categories against one registry snapshot instead of checking the version per row
+        catalog_version = CatalogCache().version()
+
+        for row_number, row in rows:
+            try:
+                product = self._build_product(row, catalog_version)
+            except ValueError as e:
+                self._record_error(report, row_number, str(e))
+                continue
+
+            # A repeated id within a chunk would hit the same row twice in one upsert
+            if product.id in chunk:
+                self._flush(chunk, report)
+                chunk = {}
+            chunk[product.id] = (row_number, product)
+
+            if len(chunk) >= chunk_size:
+                self._flush(chunk, report)
+                chunk = {}
+
+        if chunk:
+            self._flush(chunk, report)
+
+        if report["imported"]:
+            CatalogCache().bump()
+
+        return report
+
+    def _flush(self, chunk, report):
+        try:
+            with transaction.atomic():
+                ProductModel.objects.bulk_create(
+                    [product for _, product in chunk.values()],
+                    update_conflicts=True,
+                    unique_fields=["id"],
+                    update_fields=self.UPDATE_FIELDS,
+                )
+                # Upserted prices may have changed, so reprice carts holding these products
+                CartManager().refresh_totals_for_products(list(chunk.keys()))
+            report["imported"] += len(chunk)
+        except Exception as e:
+            for row_number, _ in chunk.values():
+                self._record_error(report, row_number, f"Failed to save chunk: {str(e)}")
+
+    def _record_error(self, report, row_number, error):
+        report["failed"] += 1
+        if len(report["errors"]) < self.MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    def _build_product(self, row, catalog_version):
+        if not isinstance(row, dict):
+            raise ValueError("Row must be a valid JSON object")
+
+        name = str(row.get("name") or "").strip()
+        if not name:
+            raise ValueError("name is required")
+        if len(name) > 255:
+            raise ValueError("name must be at most 255 characters")
+
+        description = str(row.get("description") or "").strip()
+        if not description:
+            raise ValueError("description is required")
+        if len(description) > 255:
+            raise ValueError("description must be at most 255 characters")
+
+        try:
+            price = Decimal(str(row.get("price", "")).strip())
+        except InvalidOperation:
+            raise ValueError("price must be a decimal number")
+        if not price.is_finite() or price < 0 or price.as_tuple().exponent < -2 or price >= Decimal("100000000"):
+            raise ValueError("price must be between 0 and 99999999.99 with at most 2 decimal places")
+
+        stock = row.get("stock")
+        try:
+            stock = int(stock) if stock not in (None, "") else 0
+        except (TypeError, ValueError):
+            raise ValueError("stock must be an integer")
+        if stock < 0:
+            raise ValueError("stock cannot be negative")
+
+        is_active = row.get("is_active")
+        if is_active in (None, ""):
+            is_active = True
+        elif not isinstance(is_active, bool):
+            value = str(is_active).strip().lower()
+            if value not in ("true", "false", "1", "0", "yes", "no"):
+                raise ValueError("is_active must be a boolean")
+            is_active = value in ("true", "1", "yes")
+
+        category = None
+        category_id = row.get("category_id") or row.get("category")
+        if category_id:
+            category = CategoryRegistry().get(str(category_id).strip(), catalog_version)
+            if category is None:
+                raise ValueError(f"Category '{category_id}' not found")
+
+        product_id = row.get("id")
+        if product_id:
+            try:
+                product_id = uuid.UUID(str(product_id))
+            except ValueError:
+                raise ValueError("id must be a UUID")
+        else:
+            product_id = uuid.uuid4()
+
+        return ProductModel(
+            id=product_id,
+            name=name,
+            description=description,
+            price=price,
+            stock=stock,
+            is_active=is_active,
+            category=category,
+        )
+
+class ProductUpdateManager:
+    """
+    Set-based bulk updates of product price, is_active and description.
+    Each patched column is written with its own UPDATE, either with a single value
+    or a CASE over product ids, so columns that are not patched are never written.
+    """
+    _instance = None
+    FIELDS = ["price", "is_active", "description"]
+    CASE_CHUNK_SIZE = 500
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ProductUpdateManager, cls).__new__(cls)
+        return cls._instance
+
+    def apply_patches(self, patches):
+        """
+        Apply a list of {"id", "price"?, "is_active"?, "description"?} patches.
+        Returns the number of matched products, per-column update counts and the
+        ids that do not exist.
+        """
+        requested_ids = list(dict.fromkeys(patch["id"] for patch in patches))
+        existing_ids = set(ProductModel.objects.filter(id__in=requested_ids).values_list("id", flat=True))
+
+        # Later patches for the same product win
+        values_by_field = {field: {} for field in self.FIELDS}
+        for patch in patches:
+            if patch["id"] not in existing_ids:
+                continue
+            for field in self.FIELDS:
+                if field in patch:
+                    values_by_field[field][patch["id"]] = patch[field]
+
+        updated = {}
+        with transaction.atomic():
+            for field, values in values_by_field.items():
+                if values:
+                    updated[field] = self._update_field(field, values)
+
+            if updated.get("price"):
+                CartManager().refresh_totals_for_products(list(values_by_field["price"].keys()))
+
+        if any(updated.values()):
+            CatalogCache().bump()
+
+        return {
+            "matched": len(existing_ids),
+            "updated": updated,
+            "not_found": [str(product_id) for product_id in requested_ids if product_id not in existing_ids],
+        }
+
+    def apply_to_queryset(self, queryset, values):
+        """Set the same values on every product in `queryset` with one UPDATE"""
+        with transaction.atomic():
+            updated = queryset.update(**values)
+
+            if updated and "price" in values:
+                CartManager().refresh_totals_for_products(queryset.values("id"))
+
+        if updated:
+            CatalogCache().bump()
+
+        return updated
+
+    def _update_field(self, field, values):
+        distinct_values = set(values.values())
+        if len(distinct_values) == 1:
+            value = distinct_values.pop()
+            # Skip rows that already hold the value so they are not rewritten
+            return ProductModel.objects.filter(id__in=values.keys()).exclude(**{field: value}).update(**{field: value})
+
+        output_field = ProductModel._meta.get_field(field)
+        product_ids = list(values.keys())
+        updated = 0
+        for start in range(0, len(product_ids), self.CASE_CHUNK_SIZE):
+            chunk = product_ids[start:start + self.CASE_CHUNK_SIZE]
+            updated += ProductModel.objects.filter(id__in=chunk).update(**{
+                field: Case(
+                    *[When(id=product_id, then=Value(values[product_id])) for product_id in chunk],
+                    output_field=output_field,
+                )
+            })
+        return updated
+
+class ProductFacetManager:
+    """
+    Catalog facet counts (per category, per price bucket, in/out of stock) from
+    one grouped aggregation. Price bucket boundaries come from PRODUCT_PRICE_BUCKETS.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ProductFacetManager, cls).__new__(cls)
+        return cls._instance
+
+    def facets(self, queryset):
+        boundaries = [Decimal(str(boundary)) for boundary in getattr(settings, "PRODUCT_PRICE_BUCKETS", [0])]
+        buckets = [
+            (boundaries[i], boundaries[i + 1] if i + 1 < len(boundaries) else None)
+            for i in range(len(boundaries))
+        ]
+
+        bucket_counts = {}
+        for index, (low, high) in enumerate(buckets):
+            price_filter = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+            bucket_counts[f"price_bucket_{index}"] = Count("id", filter=price_filter)
+
+        # One row per category; every other facet is summed from these rows
+        rows = queryset.order_by().values("category_id", "category__name").annotate(
+            count=Count("id"),
+            in_stock=Count("id", filter=Q(stock__gt=0)),
+            **bucket_counts,
+        )
+
+        total = 0
+        in_stock = 0
+        categories = []
+        price_ranges = [0] * len(buckets)
+        for row in rows:
+            total += row["count"]
+            in_stock += row["in_stock"]
+            categories.append({
+                "id": row["category_id"],
+                "name": row["category__name"],
+                "count": row["count"],
+            })
+            for index in range(len(buckets)):
+                price_ranges[index] += row[f"price_bucket_{index}"]
+
+        categories.sort(key=lambda category: (category["name"] is None, category["name"] or ""))
+
+        return {
+            "total": total,
+            "categories": categories,
+            "price_ranges": [
+                {
+                    "min": str(low),
+                    "max": str(high) if high is not None else None,
+                    "count": price_ranges[index],
+                }
+                for index, (low, high) in enumerate(buckets)
+            ],
+            "availability": {
+                "in_stock": in_stock,
+                "out_of_stock": total - in_stock,
+            },
+        }
+
+class ProductSearchManager:
+    """
+    Ranked product search over name, description and category name.
+    PostgreSQL uses the generated product.search_vector column plus trigram
+    indexes for typo tolerance; SQLite uses the product_fts FTS5 table kept in
+    sync by triggers. Both are created in migration 0012. Typo tolerance is
+    PostgreSQL-only: SQLite matches word prefixes, so "hamer" finds nothing there.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ProductSearchManager, cls).__new__(cls)
+        return cls._instance
+
+    def search(self, term, queryset, limit=20):
+        """Return up to `limit` products from `queryset` matching `term`, best match first"""
+        if connection.vendor == "postgresql":
+            return self._search_postgresql(term, queryset, limit)
+        if connection.vendor == "sqlite":
+            return self._search_sqlite(term, queryset, limit)
+        return list(
+            queryset.filter(
+                Q(name__icontains=term)
+                | Q(description__icontains=term)
+                | Q(category__name__icontains=term)
+            ).order_by("name")[:limit]
+        )
+
+    def _search_postgresql(self, term, queryset, limit):
+        text_match = RawSQL(
+            "\"product\".\"search_vector\" @@ websearch_to_tsquery('english', %s)",
+            (term,),
+            output_field=BooleanField(),
+        )
+        text_rank = RawSQL(
+            "ts_rank(\"product\".\"search_vector\", websearch_to_tsquery('english', %s))",
+            (term,),
+            output_field=FloatField(),
+        )
+        # Category matches go through a subquery on the small category table so
+        # every branch of the OR can be answered from an index on product.
+        matching_categories = CategoryModel.objects.filter(name__trigram_word_similar=term).values("id")
+
+        return list(
+            queryset.filter(
+                text_match
+                | Q(name__trigram_word_similar=term)
+                | Q(category__in=matching_categories)
+            ).annotate(
+                rank=text_rank + TrigramWordSimilarity(term, "name")
+            ).order_by("-rank", "name")[:limit]
+        )
+
+    def _search_sqlite(self, term, queryset, limit):
+        # Prefix-match every word and OR them together; bm25 puts the closest rows first
+        words = [word.replace('"', '""') for word in term.split()]
+        match = " OR ".join(f'"{word}"*' for word in words)
+
+        # Rank, filter and limit in one statement so only the returned page is loaded
+        try:
+            candidates, params = queryset.order_by().values("id").query.sql_with_params()
+        except EmptyResultSet:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT product_id FROM product_fts WHERE product_fts MATCH %s AND product_id IN ({candidates}) "
+                "ORDER BY bm25(product_fts) LIMIT %s",
+                [match, *params, limit],
+            )
+            product_ids = [uuid.UUID(row[0]) for row in cursor.fetchall()]
+
+        products = queryset.in_bulk(product_ids)
+        return [products[product_id] for product_id in product_ids if product_id in products]
 
 class ShipmentManager:
     _instance = None
+    DASHBOARD_CACHE_KEY = "shipment:dashboard"
 
     def __new__(cls):
         if cls._instance is None:
@@ -63,15 +994,19 @@ class ShipmentManager:
         
         print(f"Shipment Manager notified! Created shipment {tracking_number} for Order {order.id}")
         print(f"Shipment status updates will be handled manually by shipment managers.")
+
+        self.invalidate_dashboard()
+        self.invalidate_tracking([tracking_number])
         
         return shipment
     
     def update_shipment_status(self, shipment_id, new_status):
         """Update the status of a shipment (for manual updates by authorized users)"""
         try:
-            shipment = ShipmentModel.objects.get(id=shipment_id)
+            shipment = ShipmentModel.objects.select_related("order").get(id=shipment_id)
             old_status = shipment.status
             shipment.status = new_status
+            shipment.status_changed_at = timezone.now()
             
             # If status is delivered, set actual delivery time and update order status
             if new_status == SHIPMENT_STATUS.DELIVERED.value:
@@ -83,24 +1018,180 @@ class ShipmentManager:
             
             shipment.save()
             print(f"Shipment {shipment.tracking_number} status updated from {old_status} to: {new_status}")
+
+            self.invalidate_dashboard()
+            self.invalidate_tracking([shipment.tracking_number])
+            self.publish_status(shipment.tracking_number, new_status, shipment.order_id, shipment.order.user_id)
             
         except ShipmentModel.DoesNotExist:
             print(f"Shipment with id {shipment_id} not found")
     
-    def get_shipment_status(self, tracking_number):
-        """Get the current status of a shipment by tracking number"""
-        try:
-            shipment = ShipmentModel.objects.get(tracking_number=tracking_number)
-            return {
-                "tracking_number": shipment.tracking_number,
-                "status": shipment.status,
-                "carrier": shipment.carrier,
-                "estimated_delivery": shipment.estimated_delivery,
-                "actual_delivery": shipment.actual_delivery,
-                "order_id": shipment.order.id,
+    def publish_status(self, tracking_number, new_status, order_id, user_id):
+        """Announce a status change on /api/events/ once the surrounding transaction commits"""
+        publish_event("shipment.status", {
+            "tracking_number": tracking_number,
+            "status": new_status,
+            "order_id": order_id,
+        }, user_id=user_id)
+
+    def transition_error(self, current_status, new_status):
+        """Why a shipment cannot move from current_status to new_status, or None if it can"""
+        if current_status == SHIPMENT_STATUS.DELIVERED.value and new_status != SHIPMENT_STATUS.FAILED.value:
+            return "Cannot change status of a delivered shipment (except to failed)"
+        if current_status == SHIPMENT_STATUS.FAILED.value:
+            return "Cannot update status of a failed shipment"
+        return None
+
+    def bulk_update_status(self, updates):
+        """
+        Apply many {"tracking_number", "status", "timestamp"} status changes at once.
+        Updates are applied per shipment in timestamp order; one whose scan time is
+        older than the shipment's status_changed_at is skipped as stale, however
+        late it was uploaded. Shipments are read with one
+        locking query and written with one UPDATE per target status, and orders of
+        delivered shipments are marked delivered with one more statement.
+        Returns an outcome per update, in input order.
+        """
+        results = [None] * len(updates)
+
+        with transaction.atomic():
+            shipments = {
+                shipment["tracking_number"]: shipment
+                for shipment in ShipmentModel.objects.select_for_update().filter(
+                    tracking_number__in={update["tracking_number"] for update in updates}
+                ).values("id", "tracking_number", "status", "status_changed_at", "order_id", "order__user_id")
             }
-        except ShipmentModel.DoesNotExist:
-            return None 
+
+            changed = {}
+            ordered = sorted(range(len(updates)), key=lambda index: updates[index]["timestamp"])
+            for index in ordered:
+                update = updates[index]
+                result = {"tracking_number": update["tracking_number"], "status": update["status"]}
+                results[index] = result
+
+                shipment = shipments.get(update["tracking_number"])
+                if shipment is None:
+                    result["outcome"] = "not_found"
+                    continue
+
+                if update["timestamp"] < shipment["status_changed_at"]:
+                    result["outcome"] = "stale"
+                    continue
+
+                if update["status"] == shipment["status"]:
+                    result["outcome"] = "unchanged"
+                    continue
+
+                error = self.transition_error(shipment["status"], update["status"])
+                if error:
+                    result["outcome"] = "rejected"
+                    result["error"] = error
+                    continue
+
+                shipment["status"] = update["status"]
+                shipment["status_changed_at"] = update["timestamp"]
+                changed[shipment["id"]] = shipment
+                result["outcome"] = "updated"
+
+            by_status = {}
+            for shipment in changed.values():
+                by_status.setdefault(shipment["status"], []).append(shipment)
+
+            now = timezone.now()
+            for new_status, group in by_status.items():
+                # Record when the scan happened, not when it was uploaded
+                scanned_at = Case(
+                    *[When(pk=shipment["id"], then=Value(shipment["status_changed_at"])) for shipment in group],
+                    output_field=ShipmentModel._meta.get_field("status_changed_at")
+                )
+                values = {"status": new_status, "status_changed_at": scanned_at, "updated_at": now}
+                if new_status == SHIPMENT_STATUS.DELIVERED.value:
+                    values["actual_delivery"] = scanned_at
+                ShipmentModel.objects.filter(pk__in=[shipment["id"] for shipment in group]).update(**values)
+
+            delivered = by_status.get(SHIPMENT_STATUS.DELIVERED.value, [])
+            if delivered:
+                OrderModel.objects.filter(pk__in=[shipment["order_id"] for shipment in delivered]).update(status="delivered")
+
+            if changed:
+                self.invalidate_dashboard()
+                self.invalidate_tracking([shipment["tracking_number"] for shipment in changed.values()])
+                for shipment in changed.values():
+                    self.publish_status(shipment["tracking_number"], shipment["status"], shipment["order_id"], shipment["order__user_id"])
+
+        print(f"Bulk shipment update: {len(changed)} shipment(s) changed by {len(updates)} status update(s)")
+        return results
+
+    def dashboard(self):
+        """
+        Dashboard payload: status counts from one grouped query, the average delivery
+        time as a database-side Avg, and the ten newest shipments. Cached for
+        SHIPMENT_DASHBOARD_TTL seconds or until a shipment is created or updated.
+        """
+        data = cache.get(self.DASHBOARD_CACHE_KEY)
+        if data is not None:
+            return data
+
+        # Imported here so the base app does not depend on the api package at load time
+        from api.serializers import ShipmentModelSerializer
+
+        status_counts = dict(
+            ShipmentModel.objects.order_by().values("status").annotate(count=Count("id")).values_list("status", "count")
+        )
+
+        avg_delivery_time = ShipmentModel.objects.filter(
+            status=SHIPMENT_STATUS.DELIVERED.value,
+            actual_delivery__isnull=False
+        ).aggregate(
+            avg=Avg(ExpressionWrapper(F("actual_delivery") - F("created_at"), output_field=DurationField()))
+        )["avg"]
+
+        recent_shipments = ShipmentModel.objects.order_by("-created_at")[:10]
+
+        data = {
+            "total_shipments": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "recent_shipments": ShipmentModelSerializer(recent_shipments, many=True).data,
+            "avg_delivery_time_days": round(avg_delivery_time.total_seconds() / 86400, 2) if avg_delivery_time else None,
+            "valid_statuses": [status.value for status in SHIPMENT_STATUS]
+        }
+        cache.set(self.DASHBOARD_CACHE_KEY, data, getattr(settings, "SHIPMENT_DASHBOARD_TTL", 30))
+        return data
+
+    def invalidate_dashboard(self):
+        # Drop the snapshot once the write is visible to other requests
+        transaction.on_commit(lambda: cache.delete(self.DASHBOARD_CACHE_KEY))
+
+    def get_shipment_status(self, tracking_number):
+        """
+        Get the current status of a shipment by tracking number.
+        Answers from a cache for SHIPMENT_TRACKING_TTL seconds, unknown tracking
+        numbers included; a miss is one query on the unique tracking_number index.
+        """
+        key = self._tracking_cache_key(tracking_number)
+        status = cache.get(key)
+        if status is not None:
+            # False marks a tracking number known not to exist
+            return status or None
+
+        status = ShipmentModel.objects.filter(tracking_number=tracking_number).values(
+            "tracking_number",
+            "status",
+            "carrier",
+            "estimated_delivery",
+            "actual_delivery",
+            "order_id",
+        ).first()
+
+        cache.set(key, status or False, getattr(settings, "SHIPMENT_TRACKING_TTL", 15))
+        return status
+
+    def invalidate_tracking(self, tracking_numbers):
+        keys = [self._tracking_cache_key(tracking_number) for tracking_number in tracking_numbers]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def _tracking_cache_key(self, tracking_number):
+        return f"shipment:track:{tracking_number}"
 
 class StatisticsManager:
     _instance = None
@@ -217,16 +1308,7 @@ class StatisticsManager:
             status="delivered"
         )
 
-        total_revenue = OrderItemModel.objects.filter(
-            order__in=orders
-        ).aggregate(
-            total=Sum(
-                ExpressionWrapper(
-                    F("quantity") * F("price"),
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                )
-            )
-        )["total"] or 0
+        total_revenue = orders.aggregate(total=Sum("total"))["total"] or 0
 
         total_orders = orders.count()
         total_items_sold = OrderItemModel.objects.filter(
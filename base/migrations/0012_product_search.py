@@ -0,0 +1,93 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# PostgreSQL: a generated tsvector over name/description plus trigram GIN indexes
+# on product and category names for typo-tolerant matching.
+POSTGRESQL_FORWARDS = [
+    """
+    ALTER TABLE "product" ADD COLUMN "search_vector" tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce("name", '')), 'A') ||
+        setweight(to_tsvector('english', coalesce("description", '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX "product_search_vector_idx" ON "product" USING GIN ("search_vector")',
+    'CREATE INDEX "product_name_trgm_idx" ON "product" USING GIN ("name" gin_trgm_ops)',
+    'CREATE INDEX "category_name_trgm_idx" ON "category" USING GIN ("name" gin_trgm_ops)',
+]
+
+POSTGRESQL_BACKWARDS = [
+    'DROP INDEX IF EXISTS "category_name_trgm_idx"',
+    'DROP INDEX IF EXISTS "product_name_trgm_idx"',
+    'DROP INDEX IF EXISTS "product_search_vector_idx"',
+    'ALTER TABLE "product" DROP COLUMN IF EXISTS "search_vector"',
+]
+
+# SQLite (local and test runs): an FTS5 table kept in sync by triggers.
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE "product_fts" USING fts5(
+        product_id UNINDEXED, name, description, category_name,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO "product_fts" (product_id, name, description, category_name)
+    SELECT p."id", p."name", p."description", c."name"
+    FROM "product" p LEFT JOIN "category" c ON c."id" = p."category_id"
+    """,
+    """
+    CREATE TRIGGER "product_fts_insert" AFTER INSERT ON "product" BEGIN
+        INSERT INTO "product_fts" (product_id, name, description, category_name)
+        VALUES (new."id", new."name", new."description",
+                (SELECT "name" FROM "category" WHERE "id" = new."category_id"));
+    END
+    """,
+    """
+    CREATE TRIGGER "product_fts_update" AFTER UPDATE OF "name", "description", "category_id" ON "product" BEGIN
+        DELETE FROM "product_fts" WHERE product_id = old."id";
+        INSERT INTO "product_fts" (product_id, name, description, category_name)
+        VALUES (new."id", new."name", new."description",
+                (SELECT "name" FROM "category" WHERE "id" = new."category_id"));
+    END
+    """,
+    """
+    CREATE TRIGGER "product_fts_delete" AFTER DELETE ON "product" BEGIN
+        DELETE FROM "product_fts" WHERE product_id = old."id";
+    END
+    """,
+    """
+    CREATE TRIGGER "category_fts_update" AFTER UPDATE OF "name" ON "category" BEGIN
+        UPDATE "product_fts" SET category_name = new."name"
+        WHERE product_id IN (SELECT "id" FROM "product" WHERE "category_id" = new."id");
+    END
+    """,
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS "category_fts_update"',
+    'DROP TRIGGER IF EXISTS "product_fts_delete"',
+    'DROP TRIGGER IF EXISTS "product_fts_update"',
+    'DROP TRIGGER IF EXISTS "product_fts_insert"',
+    'DROP TABLE IF EXISTS "product_fts"',
+]
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_ordermodel_order_created_id_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(
+            _run({"postgresql": POSTGRESQL_FORWARDS, "sqlite": SQLITE_FORWARDS}),
+            _run({"postgresql": POSTGRESQL_BACKWARDS, "sqlite": SQLITE_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:03
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_totals(apps, schema_editor):
+    ShoppingCartModel = apps.get_model('base', 'ShoppingCartModel')
+    CartItemModel = apps.get_model('base', 'CartItemModel')
+
+    items = CartItemModel.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    ShoppingCartModel.objects.update(
+        total=Coalesce(
+            Subquery(items.annotate(
+                value=Sum(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+            ).values('value')),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        item_count=Coalesce(Subquery(items.annotate(value=Sum('quantity')).values('value')), Value(0)),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcartmodel',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoppingcartmodel',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:06
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hold_stock_for_unpaid_invoices(apps, schema_editor):
+    # Stock of existing unpaid orders was already taken off ProductModel.stock
+    InvoiceModel = apps.get_model('base', 'InvoiceModel')
+    OrderItemModel = apps.get_model('base', 'OrderItemModel')
+    StockReservationModel = apps.get_model('base', 'StockReservationModel')
+
+    grace_period = getattr(settings, 'STOCK_RESERVATION_GRACE_PERIOD', timedelta(0))
+    invoices = {
+        order_id: (invoice_id, due_date)
+        for invoice_id, order_id, due_date in InvoiceModel.objects.filter(
+            status__in=['pending', 'overdue']
+        ).values_list('id', 'order_id', 'due_date')
+    }
+    StockReservationModel.objects.bulk_create([
+        StockReservationModel(
+            invoice_id=invoices[item.order_id][0],
+            product_id=item.product_id,
+            quantity=item.quantity,
+            expires_at=invoices[item.order_id][1] + grace_period,
+        )
+        for item in OrderItemModel.objects.filter(order_id__in=invoices.keys()).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_shoppingcartmodel_item_count_shoppingcartmodel_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservationModel',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('consumed', 'Consumed'), ('released', 'Released')], default='active', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='base.invoicemodel')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='base.productmodel')),
+            ],
+            options={
+                'db_table': 'stock_reservation',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'), models.Index(fields=['product', 'status'], name='reservation_product_idx')],
+            },
+        ),
+        migrations.RunPython(hold_stock_for_unpaid_invoices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:08
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    OrderModel = apps.get_model('base', 'OrderModel')
+    OrderItemModel = apps.get_model('base', 'OrderItemModel')
+
+    item_totals = OrderItemModel.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        value=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    ).values('value')
+    OrderModel.objects.update(
+        subtotal=Coalesce(Subquery(item_totals), Value(0), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    )
+    OrderModel.objects.update(total=F('subtotal'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_idempotencykeymodel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordermodel',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='ordermodel',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
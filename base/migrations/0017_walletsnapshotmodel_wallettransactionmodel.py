@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    # Start each ledger from the balance held before it existed
+    UserModel = apps.get_model('base', 'UserModel')
+    WalletTransactionModel = apps.get_model('base', 'WalletTransactionModel')
+
+    WalletTransactionModel.objects.bulk_create([
+        WalletTransactionModel(user_id=user_id, amount=wallet, balance_after=wallet, kind='opening')
+        for user_id, wallet in UserModel.objects.exclude(wallet=0).values_list('id', 'wallet').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_ordermodel_subtotal_ordermodel_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletSnapshotModel',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_transaction_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'wallet_snapshot',
+                'indexes': [models.Index(fields=['user', 'last_transaction_id'], name='wallet_snapshot_user_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletTransactionModel',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kind', models.CharField(choices=[('opening', 'Opening'), ('top_up', 'Top Up'), ('withdrawal', 'Withdrawal'), ('payment', 'Payment')], max_length=20)),
+                ('reference', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'wallet_transaction',
+                'indexes': [models.Index(fields=['user', 'id'], name='wallet_txn_user_id_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0017_walletsnapshotmodel_wallettransactionmodel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoicemodel',
+            index=models.Index(fields=['status', 'due_date'], name='invoice_status_due_idx'),
+        ),
+    ]
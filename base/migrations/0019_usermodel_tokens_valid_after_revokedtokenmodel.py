@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0018_invoicemodel_invoice_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='tokens_valid_after',
+            field=models.DateTimeField(blank=True, help_text='Signed tokens issued before this time are rejected (forced logout)', null=True),
+        ),
+        migrations.CreateModel(
+            name='RevokedTokenModel',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('jti', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revoked_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'revoked_token',
+                'indexes': [models.Index(fields=['expires_at'], name='revoked_token_expires_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:27
+
+from django.db import migrations, models
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersionModel = apps.get_model('base', 'CatalogVersionModel')
+    CatalogVersionModel.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0019_usermodel_tokens_valid_after_revokedtokenmodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersionModel',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'catalog_version',
+            },
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
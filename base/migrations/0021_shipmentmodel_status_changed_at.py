@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:29
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_status_changed_at(apps, schema_editor):
+    ShipmentModel = apps.get_model('base', 'ShipmentModel')
+    ShipmentModel.objects.update(status_changed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0020_catalogversionmodel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipmentmodel',
+            name='status_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_status_changed_at, migrations.RunPython.noop),
+    ]
@@ -9,3 +9,9 @@ from .cart_item_model import CartItemModel
 from .invoice_model import InvoiceModel
 from .payment_model import PaymentModel
 from .receipt_model import ReceiptModel
+from .stock_reservation_model import StockReservationModel
+from .idempotency_key_model import IdempotencyKeyModel
+from .wallet_transaction_model import WalletTransactionModel
+from .wallet_snapshot_model import WalletSnapshotModel
+from .revoked_token_model import RevokedTokenModel
+from .catalog_version_model import CatalogVersionModel
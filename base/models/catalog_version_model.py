@@ -0,0 +1,15 @@
+from django.db import models
+
+class CatalogVersionModel(models.Model):
+    """
+    Single-row counter that versions cached catalog responses. It lives in the
+    database so a bump made by one process is seen by every other process.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
+    class Meta:
+        db_table = "catalog_version"
@@ -1,6 +1,6 @@
 import re
 
-from django.db import models
+from django.db import models, transaction
 
 class CategoryModel(models.Model):
     id = models.CharField(
@@ -18,6 +18,17 @@ class CategoryModel(models.Model):
         stripped = re.sub(r"\s+", "", self.name)
         self.id = stripped.lower()
         super().save(*args, **kwargs)
+        self._invalidate_registry()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_registry()
+        return result
+
+    def _invalidate_registry(self):
+        from base.managers import CatalogCache, CategoryRegistry
+        transaction.on_commit(CategoryRegistry().invalidate)
+        CatalogCache().bump()
 
     def __str__(self):
         return self.name
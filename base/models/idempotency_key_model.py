@@ -0,0 +1,34 @@
+from django.db import models
+
+from .user_model import UserModel
+
+class IdempotencyKeyModel(models.Model):
+    """
+    The outcome of a request sent with an Idempotency-Key header. While the first
+    attempt runs, response_status is null; afterwards retries with the same key
+    replay the stored response until expires_at.
+    """
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    locked_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for {self.user.username}"
+
+    @property
+    def is_completed(self):
+        return self.response_status is not None
+
+    class Meta:
+        db_table = "idempotency_key"
+        unique_together = ("user", "key")
+        indexes = [
+            models.Index(fields=["expires_at"], name="idempotency_expires_idx"),
+        ]
@@ -24,13 +24,20 @@ class InvoiceModel(models.Model):
     
     @property
     def is_overdue(self):
-        """Check if invoice is overdue"""
+        """Check if invoice is overdue, whether or not the sweeper has marked it yet"""
+        if self.status == INVOICE_STATUS.OVERDUE.value:
+            return True
         return self.status == INVOICE_STATUS.PENDING.value and timezone.now() > self.due_date
     
     def mark_as_paid(self):
         """Mark invoice as paid"""
         self.status = INVOICE_STATUS.PAID.value
-        self.save()
+        self.save(update_fields=["status", "updated_at"])
     
     class Meta:
-        db_table = "invoice" 
+        db_table = "invoice"
+        indexes = [
+            # Find pending invoices past their due date
+            models.Index(fields=["status", "due_date"], name="invoice_status_due_idx"),
+        ]
+
@@ -13,6 +13,9 @@ class OrderModel(models.Model):
         choices=[(status.value, status.name.replace("_", " ").title()) for status in ORDER_PAYMENT_STATUS],
         default=ORDER_PAYMENT_STATUS.PENDING.value
     )
+    # Written once from the order items when the order is placed
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
     # Shipping address fields
     shipping_full_name = models.CharField(max_length=255)
@@ -23,15 +26,15 @@ class OrderModel(models.Model):
     def __str__(self):
         return f"Order {self.pk} by {self.user.username}"
 
-    @property
-    def total(self):
-        """Calculate total price of all items in this order"""
-        return sum(item.price * item.quantity for item in self.items.all())
-
     @property
     def is_paid(self):
         """Check if order is fully paid"""
         return self.payment_status == ORDER_PAYMENT_STATUS.PAID.value
 
     class Meta:
-        db_table = "order"  
+        db_table = "order"
+        indexes = [
+            # Support keyset pagination of all orders and of a customer's orders
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            models.Index(fields=["user", "created_at", "id"], name="order_user_created_id_idx"),
+        ]  
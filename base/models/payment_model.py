@@ -27,7 +27,7 @@ class PaymentModel(models.Model):
         from django.utils import timezone
         self.status = PAYMENT_STATUS.COMPLETED.value
         self.completed_at = timezone.now()
-        self.save()
+        self.save(update_fields=["status", "completed_at"])
     
     class Meta:
         db_table = "payment" 
@@ -18,8 +18,26 @@ class ProductModel(models.Model):
         related_name="products"
     )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._bump_catalog()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._bump_catalog()
+        return result
+
+    def _bump_catalog(self):
+        # Set-based writes that bypass save() must call CatalogCache().bump() themselves
+        from base.managers import CatalogCache
+        CatalogCache().bump()
+
     def __str__(self):
         return self.name
 
     class Meta:
         db_table = "product"
+        indexes = [
+            # Supports keyset pagination of the catalog ordered by (name, id)
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+        ]
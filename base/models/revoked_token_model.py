@@ -0,0 +1,23 @@
+from django.db import models
+
+from .user_model import UserModel
+
+class RevokedTokenModel(models.Model):
+    """
+    A signed token revoked before its expiry, e.g. by logout or because a refresh
+    token was used. Rows are only needed until expires_at.
+    """
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name="revoked_tokens")
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Revoked token {self.jti} of {self.user.username}"
+
+    class Meta:
+        db_table = "revoked_token"
+        indexes = [
+            models.Index(fields=["expires_at"], name="revoked_token_expires_idx"),
+        ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from .order_model import OrderModel
 
@@ -16,6 +17,9 @@ class ShipmentModel(models.Model):
     carrier = models.CharField(max_length=100, default="AWE Express")
     estimated_delivery = models.DateTimeField(null=True, blank=True)
     actual_delivery = models.DateTimeField(null=True, blank=True)
+    # When the current status took effect: the scan time for bulk updates, otherwise
+    # the time of the change. Older scans than this are rejected as stale.
+    status_changed_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -23,4 +27,8 @@ class ShipmentModel(models.Model):
         return f"Shipment {self.tracking_number} for Order {self.order.id}"
     
     class Meta:
-        db_table = "shipment" 
+        db_table = "shipment"
+        indexes = [
+            # Supports keyset pagination of shipments ordered by (created_at, id)
+            models.Index(fields=["created_at", "id"], name="shipment_created_id_idx"),
+        ] 
@@ -1,27 +1,29 @@
-from django.db import models
+from django.db import models, transaction
 
 from .user_model import UserModel 
 
 class ShoppingCartModel(models.Model):
     id = models.AutoField(primary_key=True)
     user = models.OneToOneField(UserModel, on_delete=models.CASCADE, related_name="shopping_cart")
+    # Denormalized totals, kept in step with cart item writes by CartManager
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Shopping Cart for {self.user.username}"
 
-    @property
-    def total(self):
-        """Calculate total price of all items in the cart"""
-        return sum(item.product.price * item.quantity for item in self.items.all())
-
     @property
     def total_items(self):
         """Get total number of items in the cart"""
-        return sum(item.quantity for item in self.items.all())
+        return self.item_count
 
     def clear(self):
-        """Remove all items from the cart"""
-        self.items.all().delete()
+        """Remove all items from the cart and reset its totals"""
+        with transaction.atomic():
+            self.items.all().delete()
+            ShoppingCartModel.objects.filter(pk=self.pk).update(total=0, item_count=0)
+        self.total = 0
+        self.item_count = 0
 
     class Meta:
         db_table = "shopping_cart" 
@@ -0,0 +1,36 @@
+from django.db import models
+
+from .invoice_model import InvoiceModel
+from .product_model import ProductModel
+
+from base.enums import RESERVATION_STATUS
+
+class StockReservationModel(models.Model):
+    """
+    Stock held for an unpaid invoice. The quantity has already been taken off
+    ProductModel.stock; it is consumed when the invoice is paid or returned to
+    stock once the hold expires.
+    """
+    id = models.AutoField(primary_key=True)
+    invoice = models.ForeignKey(InvoiceModel, on_delete=models.CASCADE, related_name="reservations")
+    product = models.ForeignKey(ProductModel, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=20,
+        choices=[(status.value, status.name.title()) for status in RESERVATION_STATUS],
+        default=RESERVATION_STATUS.ACTIVE.value
+    )
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} held for Invoice {self.invoice.invoice_number}"
+
+    class Meta:
+        db_table = "stock_reservation"
+        indexes = [
+            # Find expired holds for the sweeper
+            models.Index(fields=["status", "expires_at"], name="reservation_status_exp_idx"),
+            # Sum held stock per product
+            models.Index(fields=["product", "status"], name="reservation_product_idx"),
+        ]
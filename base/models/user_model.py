@@ -39,6 +39,11 @@ class UserModel(AbstractBaseUser):
         default=0.00,
         help_text="Customer's wallet balance (only used for customer role)"
     )
+    tokens_valid_after = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Signed tokens issued before this time are rejected (forced logout)"
+    )
 
     objects = UserManager()
 
@@ -0,0 +1,23 @@
+from django.db import models
+
+from .user_model import UserModel
+
+class WalletSnapshotModel(models.Model):
+    """
+    A user's wallet balance after all of their wallet transactions up to and
+    including last_transaction_id.
+    """
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name="wallet_snapshots")
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_transaction_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Wallet snapshot of {self.user.username}: {self.balance}"
+
+    class Meta:
+        db_table = "wallet_snapshot"
+        indexes = [
+            models.Index(fields=["user", "last_transaction_id"], name="wallet_snapshot_user_idx"),
+        ]
@@ -0,0 +1,31 @@
+from django.db import models
+
+from .user_model import UserModel
+
+from base.enums import WALLET_TRANSACTION_TYPE
+
+class WalletTransactionModel(models.Model):
+    """
+    Append-only record of every change to a customer's wallet. UserModel.wallet
+    holds the running balance and is updated in the same transaction as each row.
+    """
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name="wallet_transactions")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    kind = models.CharField(
+        max_length=20,
+        choices=[(kind.value, kind.name.replace("_", " ").title()) for kind in WALLET_TRANSACTION_TYPE]
+    )
+    reference = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} of {self.amount} for {self.user.username}"
+
+    class Meta:
+        db_table = "wallet_transaction"
+        indexes = [
+            # Wallet history pages and deltas since the latest snapshot
+            models.Index(fields=["user", "id"], name="wallet_txn_user_id_idx"),
+        ]
@@ -0,0 +1,181 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from base.enums import ROLE, SHIPMENT_STATUS, WALLET_TRANSACTION_TYPE
+from base.managers import CartManager, ProductUpdateManager, ShipmentManager, WalletManager
+from base.models import CartItemModel, OrderModel, ProductModel, ShipmentModel, ShoppingCartModel, UserModel, WalletSnapshotModel, WalletTransactionModel
+
+def create_user(username, role=ROLE.CUSTOMER, wallet=0):
+    return UserModel.objects.create(
+        username=username,
+        email=f"{username}@example.com",
+        firstName=username,
+        lastName="Test",
+        password="secret",
+        role=role.value,
+        wallet=wallet,
+    )
+
+def create_product(name, price, stock=10):
+    return ProductModel.objects.create(name=name, description=name, price=Decimal(price), stock=stock)
+
+def create_order(user, **fields):
+    return OrderModel.objects.create(
+        user=user,
+        shipping_full_name="Test Customer",
+        shipping_address="1 Test St",
+        shipping_city="Melbourne",
+        shipping_postal_code="3000",
+        **fields
+    )
+
+class CartTotalsTests(TestCase):
+    def setUp(self):
+        self.cart = ShoppingCartModel.objects.create(user=create_user("dave"))
+        self.pen = create_product("Pen", "2.50")
+        self.book = create_product("Book", "12.00")
+
+    def assertStoredTotals(self, total, item_count):
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.total, self.cart.item_count), (Decimal(total), item_count))
+
+    def test_item_writes_keep_totals_in_step(self):
+        cart_manager = CartManager()
+        cart_manager.add_item(self.cart, self.pen, 2)
+        cart_manager.add_item(self.cart, self.book, 1)
+        cart_manager.add_item(self.cart, self.pen, 1)
+        self.assertStoredTotals("19.50", 4)
+
+        pen_line = CartItemModel.objects.select_related("product").get(cart=self.cart, product=self.pen)
+        cart_manager.set_item_quantity(self.cart, pen_line, 5)
+        self.assertStoredTotals("24.50", 6)
+
+        book_line = CartItemModel.objects.select_related("product").get(cart=self.cart, product=self.book)
+        cart_manager.remove_item(self.cart, book_line)
+        self.assertStoredTotals("12.50", 5)
+        self.assertEqual(cart_manager.reconcile(), 0)
+
+    def test_set_and_remove_use_the_stored_quantity(self):
+        cart_manager = CartManager()
+        cart_manager.add_item(self.cart, self.pen, 2)
+        pen_line = CartItemModel.objects.select_related("product").get(cart=self.cart, product=self.pen)
+
+        # A concurrent request adds to the line after it was read
+        cart_manager.add_item(self.cart, self.pen, 3)
+        cart_manager.set_item_quantity(self.cart, pen_line, 4)
+        self.assertStoredTotals("10.00", 4)
+
+        cart_manager.add_item(self.cart, self.pen, 1)
+        cart_manager.remove_item(self.cart, pen_line)
+        self.assertStoredTotals("0.00", 0)
+        self.assertEqual(cart_manager.reconcile(), 0)
+
+    def test_price_change_reprices_carts(self):
+        CartManager().add_item(self.cart, self.pen, 4)
+        ProductUpdateManager().apply_patches([{"id": self.pen.id, "price": Decimal("3.00")}])
+        self.assertStoredTotals("12.00", 4)
+
+    def test_reconcile_repairs_drifted_totals(self):
+        CartManager().add_item(self.cart, self.book, 2)
+        ShoppingCartModel.objects.filter(pk=self.cart.pk).update(total=Decimal("1.00"), item_count=7)
+
+        self.assertEqual(CartManager().reconcile(), 1)
+        self.assertStoredTotals("24.00", 2)
+        self.assertEqual(CartManager().reconcile(), 0)
+
+class BulkShipmentStatusTests(TestCase):
+    def setUp(self):
+        self.order = create_order(create_user("grace"))
+        self.shipment = ShipmentManager().create_shipment(self.order)
+        self.t0 = timezone.now() - timedelta(minutes=10)
+        ShipmentModel.objects.filter(pk=self.shipment.pk).update(status_changed_at=self.t0)
+
+    def scan(self, status, seconds):
+        return {"tracking_number": self.shipment.tracking_number, "status": status, "timestamp": self.t0 + timedelta(seconds=seconds)}
+
+    def test_newer_scan_uploaded_later_is_applied(self):
+        results = ShipmentManager().bulk_update_status([self.scan(SHIPMENT_STATUS.SHIPPED.value, 1)])
+        self.assertEqual(results[0]["outcome"], "updated")
+
+        # Uploaded after the first batch, but scanned after the first scan
+        results = ShipmentManager().bulk_update_status([self.scan(SHIPMENT_STATUS.DELIVERED.value, 2)])
+        self.assertEqual(results[0]["outcome"], "updated")
+
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.status, SHIPMENT_STATUS.DELIVERED.value)
+        self.assertEqual(self.shipment.status_changed_at, self.t0 + timedelta(seconds=2))
+        self.assertEqual(self.shipment.actual_delivery, self.t0 + timedelta(seconds=2))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "delivered")
+
+    def test_older_scan_uploaded_later_is_stale(self):
+        ShipmentManager().bulk_update_status([self.scan(SHIPMENT_STATUS.IN_TRANSIT.value, 5)])
+        results = ShipmentManager().bulk_update_status([self.scan(SHIPMENT_STATUS.SHIPPED.value, 3)])
+        self.assertEqual(results[0]["outcome"], "stale")
+
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.status, SHIPMENT_STATUS.IN_TRANSIT.value)
+
+    def test_scans_in_one_batch_apply_in_timestamp_order(self):
+        results = ShipmentManager().bulk_update_status([
+            self.scan(SHIPMENT_STATUS.OUT_FOR_DELIVERY.value, 4),
+            self.scan(SHIPMENT_STATUS.SHIPPED.value, 2),
+            {"tracking_number": "MISSING", "status": SHIPMENT_STATUS.SHIPPED.value, "timestamp": self.t0},
+        ])
+        self.assertEqual([result["outcome"] for result in results], ["updated", "updated", "not_found"])
+
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.status, SHIPMENT_STATUS.OUT_FOR_DELIVERY.value)
+
+    def test_manual_update_moves_status_changed_at_to_now(self):
+        ShipmentManager().update_shipment_status(self.shipment.id, SHIPMENT_STATUS.PROCESSING.value)
+        self.shipment.refresh_from_db()
+        self.assertGreater(self.shipment.status_changed_at, self.t0)
+
+class WalletLedgerTests(TestCase):
+    def setUp(self):
+        self.user = create_user("judy")
+
+    def test_adjust_never_overdraws(self):
+        wallet_manager = WalletManager()
+        wallet_manager.set_balance(self.user, Decimal("10.00"))
+
+        self.assertIsNone(wallet_manager.adjust(self.user, Decimal("-10.01"), WALLET_TRANSACTION_TYPE.PAYMENT))
+        entry = wallet_manager.adjust(self.user, Decimal("-4.00"), WALLET_TRANSACTION_TYPE.PAYMENT, "INV1")
+        self.assertEqual(entry.balance_after, Decimal("6.00"))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet, Decimal("6.00"))
+        self.assertEqual(WalletTransactionModel.objects.filter(user=self.user).count(), 2)
+
+    def test_snapshots_cover_only_new_transactions(self):
+        wallet_manager = WalletManager()
+        wallet_manager.set_balance(self.user, Decimal("50.00"))
+        wallet_manager.adjust(self.user, Decimal("-20.00"), WALLET_TRANSACTION_TYPE.PAYMENT)
+
+        self.assertEqual(wallet_manager.take_snapshots(), {"snapshots": 1, "mismatched": []})
+        self.assertEqual(wallet_manager.take_snapshots(), {"snapshots": 0, "mismatched": []})
+
+        wallet_manager.set_balance(self.user, Decimal("45.00"))
+        self.assertEqual(wallet_manager.take_snapshots(), {"snapshots": 1, "mismatched": []})
+        latest = WalletSnapshotModel.objects.filter(user=self.user).order_by("-last_transaction_id").first()
+        self.assertEqual(latest.balance, Decimal("45.00"))
+
+        # Builds on the latest of several earlier snapshots
+        wallet_manager.adjust(self.user, Decimal("-15.00"), WALLET_TRANSACTION_TYPE.PAYMENT)
+        self.assertEqual(wallet_manager.take_snapshots(), {"snapshots": 1, "mismatched": []})
+        self.assertEqual(WalletSnapshotModel.objects.filter(user=self.user).order_by("-last_transaction_id").first().balance, Decimal("30.00"))
+
+    def test_snapshot_reports_a_ledger_that_does_not_add_up(self):
+        WalletManager().set_balance(self.user, Decimal("50.00"))
+        WalletTransactionModel.objects.create(
+            user=self.user,
+            amount=Decimal("-5.00"),
+            balance_after=Decimal("40.00"),
+            kind=WALLET_TRANSACTION_TYPE.PAYMENT.value,
+        )
+
+        self.assertEqual(WalletManager().take_snapshots()["mismatched"], [str(self.user.id)])